@@ -0,0 +1,5 @@
+"""Offline benchmarks for the SRF Weather integration.
+
+Run them from the repository root, e.g. `python -m benchmarks.suite`.
+The inputs are synthetic but deterministic payloads shaped like the real API responses (`payloads.py`), the suite serves them through a local fake API server (`fake_api.py`).
+"""
@@ -0,0 +1,118 @@
+"""Forecast conversion: filling the series column by column vs. one interval at a time.
+
+The steps that used to scan the data separately are compared on their own as well: joining the uv index of the day to the hourly forecasts and mapping symbol codes to conditions.
+The original eager conversion in `legacy.py` is only listed for reference.
+It builds a dict per interval and doesn't merge the `hours` and `three_hours` timelines, intern colors or index the series, so it does less work and is faster to convert.
+
+    python -m benchmarks.conversion
+"""
+
+import timeit
+from datetime import datetime
+
+from custom_components.srf_weather import api
+from custom_components.srf_weather.forecast import (
+    SrfForecastData,
+    _daily_builder,
+    _hourly_builder,
+    _join_by_day,
+    _SeriesBuilder,
+    condition_from_symbol_code,
+)
+
+from . import legacy
+from .payloads import forecast_week
+
+
+def _check(fw: dict) -> None:
+    """The new conversion has to agree with the original one for every hourly forecast both of them have."""
+    data = SrfForecastData.create_from_api(fw)
+    assert data.as_dict() == _create_row_by_row(fw).as_dict()
+    hourly, daily = legacy.create_from_api(fw)
+    by_datetime = {forecast["datetime"]: forecast for forecast in reversed(hourly)}
+    for forecast in data.hourly:
+        original = by_datetime[forecast["datetime"]]
+        assert forecast["uv_index"] == original["uv_index"], forecast["datetime"]
+        assert forecast["condition"] == original["condition"], forecast["datetime"]
+    assert [forecast["condition"] for forecast in data.daily] == [
+        forecast["condition"] for forecast in daily
+    ]
+
+
+def _append_all(builder: _SeriesBuilder, intervals: list[dict]) -> _SeriesBuilder:
+    for interval in intervals:
+        builder.append(interval)
+    return builder
+
+
+def _create_row_by_row(fw: api.ForecastPointWeek) -> SrfForecastData:
+    """`SrfForecastData.create_from_api`, but appending the intervals to the series one at a time."""
+    return SrfForecastData._create_from_builders(
+        fw["geolocation"],
+        _append_all(_hourly_builder(), fw["hours"]),
+        _append_all(_hourly_builder(), fw["three_hours"]),
+        _append_all(_daily_builder(), fw["days"]),
+        resample_step=None,
+    )
+
+
+def _join_by_date(days: list[dict], intervals: list[dict]) -> list[float | None]:
+    uvi_by_date = legacy._build_uvi_by_date(days)
+    return [
+        legacy._get_uvi_for_hourly(uvi_by_date, interval["date_time"])
+        for interval in intervals
+    ]
+
+
+def _condition_by_dict(code: int) -> str | None:
+    try:
+        return legacy._INV_ICON2COND[code]
+    except KeyError:
+        return legacy._INV_ICON2COND.get(-code)
+
+
+def main() -> None:
+    fw = forecast_week()
+    _check(fw)
+
+    intervals = [*fw["hours"], *fw["three_hours"]]
+    days = fw["days"]
+    symbol_codes = [interval["symbol_code"] for interval in (*intervals, *days)]
+
+    hourly = _hourly_builder()
+    hourly.extend(intervals)
+    daily = _daily_builder()
+    daily.extend(days)
+    hourly_days = hourly.get_days()
+    daily_days = daily.get_days()
+    uv_index = daily.get_numbers("uv_index")
+
+    number = 200
+    cases = {
+        "create_from_api (row by row)": lambda: _create_row_by_row(fw),
+        "create_from_api (by column)": lambda: SrfForecastData.create_from_api(fw),
+        "eager dicts (reference)": lambda: legacy.create_from_api(fw),
+        "uv index join (reparse)": lambda: _join_by_date(days, intervals),
+        "uv index join (by day)": lambda: _join_by_day(
+            daily_days, uv_index, hourly_days
+        ),
+        "conditions (dict + negation)": lambda: [
+            _condition_by_dict(code) for code in symbol_codes
+        ],
+        "conditions (dense table)": lambda: [
+            condition_from_symbol_code(code) for code in symbol_codes
+        ],
+        "timestamp parsing (per row)": lambda: [
+            datetime.fromisoformat(interval["date_time"]) for interval in intervals
+        ],
+    }
+    print(
+        f"{len(fw['hours'])} hours / {len(fw['three_hours'])} three_hours / {len(days)} days"
+    )
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:<32} {best * 1e6:9.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Peak memory and time of decoding a `forecastpoint` response body into forecast data."""
+
+import gc
+import json
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from custom_components.srf_weather.forecast import SrfForecastData
+
+from .payloads import forecast_week
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _measure_peak_memory(decode: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        decode()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    body = json.dumps(forecast_week()).encode()
+    print(f"payload: {len(body) / 1024:.1f} KiB")
+
+    cases: dict[str, Callable[[], Any]] = {
+        "json": lambda: SrfForecastData.create_from_api(json.loads(body)),
+    }
+    if orjson is not None:
+        cases["orjson"] = lambda: SrfForecastData.create_from_api(orjson.loads(body))
+    else:
+        print("orjson not installed, skipping")
+
+    expected = cases["json"]().as_dict()
+    number = 50
+    for name, decode in cases.items():
+        assert decode().as_dict() == expected, name
+        peak = _measure_peak_memory(decode)
+        best = min(timeit.repeat(decode, number=number, repeat=5)) / number
+        print(f"{name:<24} {best * 1e6:9.1f} µs  peak {peak / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Local aiohttp server that serves the synthetic SRF Meteo payloads of `payloads.py`.
+
+It emulates the OAuth token endpoint and the rate limit headers of the real API, so `api.Client` can be used against it unchanged.
+"""
+
+import asyncio
+import base64
+import copy
+import json
+import time
+from typing import Any
+
+from aiohttp import web
+from yarl import URL
+
+from . import payloads
+
+_TOKEN_LIFETIME = 3600
+_RATELIMIT_WINDOW_MS = 24 * 60 * 60 * 1000
+
+
+class FakeSrfApi:
+    """Serves synthetic `forecastpoint`, `geolocations` and `geolocationNames` responses.
+
+    Use it as an async context manager, `base_url` and `oauth_url` are only valid while it's running.
+    """
+
+    def __init__(
+        self,
+        *,
+        consumer_key: str = "key",
+        consumer_secret: str = "secret",
+        ratelimit: int = 10_000,
+        latency: float = 0.0,
+    ) -> None:
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.ratelimit = ratelimit
+        self.latency = latency
+
+        self.available = ratelimit
+        self.reset_time_ms = int(time.time() * 1000) + _RATELIMIT_WINDOW_MS
+        self.token_requests = 0
+        self.api_requests = 0
+        # requests being handled right now and the most there ever were at the same time
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+        self._forecastpoint = payloads.forecast_week()
+        self._geolocations = payloads.geolocations()
+        self._geolocation_names = payloads.geolocation_names()
+        self._bodies: dict[str, bytes] = {}
+        self._tokens: set[str] = set()
+
+        app = web.Application()
+        app.router.add_post("/oauth/v1/accesstoken", self._handle_accesstoken)
+        app.router.add_get(
+            "/srf-meteo/v2/forecastpoint/{geolocation_id}", self._handle_forecastpoint
+        )
+        app.router.add_get("/srf-meteo/v2/geolocations", self._handle_geolocations)
+        app.router.add_get(
+            "/srf-meteo/v2/geolocationNames", self._handle_geolocation_names
+        )
+        self._runner = web.AppRunner(app, access_log=None)
+        self._url: URL | None = None
+
+    @property
+    def base_url(self) -> URL:
+        assert self._url, "server isn't running"
+        return self._url / "srf-meteo/v2"
+
+    @property
+    def oauth_url(self) -> URL:
+        assert self._url, "server isn't running"
+        return self._url / "oauth/v1/accesstoken"
+
+    async def __aenter__(self) -> "FakeSrfApi":
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self._url = URL.build(scheme="http", host=host, port=port)
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self._runner.cleanup()
+        self._url = None
+
+    async def _handle_accesstoken(self, request: web.Request) -> web.Response:
+        self.token_requests += 1
+        expected = base64.b64encode(
+            f"{self.consumer_key}:{self.consumer_secret}".encode()
+        ).decode()
+        if request.headers.get("Authorization") != f"Basic {expected}":
+            raise web.HTTPUnauthorized()
+        if request.query.get("grant_type") != "client_credentials":
+            raise web.HTTPBadRequest()
+
+        token = f"token-{self.token_requests}"
+        self._tokens.add(token)
+        return web.json_response(
+            {
+                "access_token": token,
+                "expires_in": _TOKEN_LIFETIME,
+                "token_type": "Bearer",
+            }
+        )
+
+    async def _handle_api(
+        self, request: web.Request, key: str, data: Any
+    ) -> web.Response:
+        self.api_requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self._respond(request, key, data)
+        finally:
+            self.in_flight -= 1
+
+    async def _respond(self, request: web.Request, key: str, data: Any) -> web.Response:
+        authorization = request.headers.get("Authorization", "")
+        if authorization.removeprefix("Bearer ") not in self._tokens:
+            raise web.HTTPUnauthorized()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        status = 200
+        if self.available > 0:
+            self.available -= 1
+        else:
+            status = 429
+        headers = {
+            "x-ratelimit-allowed": str(self.ratelimit),
+            "x-ratelimit-available": str(self.available),
+            "x-ratelimit-reset-time": str(self.reset_time_ms),
+        }
+        if status != 200:
+            return web.Response(status=status, headers=headers)
+
+        body = self._bodies.get(key)
+        if body is None:
+            body = self._bodies[key] = json.dumps(data, ensure_ascii=False).encode()
+        return web.Response(body=body, headers=headers, content_type="application/json")
+
+    async def _handle_forecastpoint(self, request: web.Request) -> web.Response:
+        geolocation_id = request.match_info["geolocation_id"]
+        key = f"forecastpoint/{geolocation_id}"
+        if key in self._bodies:
+            return await self._handle_api(request, key, None)
+
+        data = copy.deepcopy(self._forecastpoint)
+        data["geolocation"]["id"] = geolocation_id
+        return await self._handle_api(request, key, data)
+
+    async def _handle_geolocations(self, request: web.Request) -> web.Response:
+        return await self._handle_api(request, "geolocations", self._geolocations)
+
+    async def _handle_geolocation_names(self, request: web.Request) -> web.Response:
+        names = self._geolocation_names
+        if name := request.query.get("name"):
+            names = [n for n in names if n["name"].lower().startswith(name.lower())]
+        if zip_code := request.query.get("zip"):
+            names = [n for n in names if str(n["location_id"]) == zip_code]
+        return await self._handle_api(
+            request, f"geolocationNames?{request.query_string}", names
+        )
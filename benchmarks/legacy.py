@@ -0,0 +1,119 @@
+"""The original eager conversion, kept as a baseline for the benchmarks.
+
+Forecasts are converted into a list of `ForecastSrf` dicts each, exactly like the integration did before the columnar store.
+"""
+
+from datetime import date, datetime
+
+from custom_components.srf_weather import api
+from custom_components.srf_weather.forecast import ICON_CONDITION_MAP, ForecastSrf
+
+
+def create_from_api(
+    forecast_week: api.ForecastPointWeek,
+) -> tuple[list[ForecastSrf], list[ForecastSrf]]:
+    uvi_by_date = _build_uvi_by_date(forecast_week["days"])
+    hourly = [
+        forecast_from_hourly(
+            forecast,
+            uv_index=_get_uvi_for_hourly(uvi_by_date, forecast["date_time"]),
+        )
+        for forecast in forecast_week["hours"]
+    ]
+    hourly.extend(
+        forecast_from_hourly(
+            forecast,
+            uv_index=_get_uvi_for_hourly(uvi_by_date, forecast["date_time"]),
+        )
+        for forecast in forecast_week["three_hours"]
+    )
+    daily = [forecast_from_daily(forecast) for forecast in forecast_week["days"]]
+    return hourly, daily
+
+
+def _build_uvi_by_date(days: list[api.DayForecastInterval]) -> dict[date, float | None]:
+    mapping: dict[date, float | None] = {}
+    for day in days:
+        dt = datetime.fromisoformat(day["date_time"])
+        mapping[dt.date()] = day.get("UVI")
+    return mapping
+
+
+def _get_uvi_for_hourly(
+    uvi_by_date: dict[date, float | None], date_time: str
+) -> float | None:
+    dt = datetime.fromisoformat(date_time)
+    return uvi_by_date.get(dt.date())
+
+
+def forecast_from_hourly(
+    forecast: api.OneHourForecastInterval, *, uv_index: float | None
+) -> ForecastSrf:
+    return ForecastSrf(
+        condition=condition_from_forecast(forecast),
+        datetime=forecast["date_time"],
+        humidity=forecast.get("RELHUM_PERCENT"),
+        precipitation_probability=forecast["PROBPCP_PERCENT"],
+        cloud_coverage=None,
+        native_precipitation=forecast["RRR_MM"],
+        native_pressure=forecast.get("PRESSURE_HPA"),
+        native_temperature=forecast["TTT_C"],
+        native_templow=forecast.get("TTL_C"),
+        native_apparent_temperature=forecast.get("TTTFEEL_C"),
+        wind_bearing=forecast["DD_DEG"],
+        native_wind_gust_speed=forecast["FX_KMH"],
+        native_wind_speed=forecast["FF_KMH"],
+        native_dew_point=forecast.get("DEWPOINT_C"),
+        uv_index=uv_index,
+        is_daytime=None,
+        # srf extra
+        symbol_code=forecast.get("symbol_code"),
+        symbol24_code=forecast.get("symbol24_code"),
+        temphigh=forecast.get("TTH_C"),
+        fresh_snow_cm=forecast.get("FRESHSNOW_CM"),
+        sunshine_minutes=forecast.get("SUN_MIN"),
+        irradiance=forecast.get("IRRADIANCE_WM2"),
+        color=forecast.get("cur_color"),
+    )
+
+
+def forecast_from_daily(forecast: api.DayForecastInterval) -> ForecastSrf:
+    return ForecastSrf(
+        condition=condition_from_forecast(forecast),
+        datetime=forecast["date_time"],
+        humidity=None,
+        precipitation_probability=forecast["PROBPCP_PERCENT"],
+        cloud_coverage=None,
+        native_precipitation=forecast["RRR_MM"],
+        native_pressure=None,
+        native_temperature=forecast["TX_C"],  # this is technically the max temperature
+        native_templow=forecast["TN_C"],
+        native_apparent_temperature=None,
+        wind_bearing=forecast["DD_DEG"],
+        native_wind_gust_speed=forecast["FX_KMH"],
+        native_wind_speed=forecast["FF_KMH"],
+        native_dew_point=None,
+        uv_index=forecast.get("UVI"),
+        is_daytime=None,
+        # srf extra
+        symbol_code=forecast.get("symbol_code"),
+        symbol24_code=forecast.get("symbol24_code"),
+        sunrise=forecast.get("SUNRISE"),
+        sunset=forecast.get("SUNSET"),
+        sunshine_hours=forecast.get("SUN_H"),
+    )
+
+
+_INV_ICON2COND = {
+    icon: condition for condition, icons in ICON_CONDITION_MAP.items() for icon in icons
+}
+
+
+def condition_from_forecast(forecast: api.ForecastABC) -> str | None:
+    icon = forecast["symbol_code"]
+    try:
+        return _INV_ICON2COND[icon]
+    except KeyError:
+        pass
+    # invert day / night (night icons are negative) and try to look up that
+    return _INV_ICON2COND.get(-icon)
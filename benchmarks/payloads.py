@@ -0,0 +1,175 @@
+"""Deterministic SRF Meteo payloads shaped like the real API responses."""
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+_TZ = timezone(timedelta(hours=2))
+_SYMBOL_CODES = (1, 2, 3, 4, 5, 6, 8, 10, 11, 17, 18, 19, 20, 21, 23, 25, -1, -3)
+
+
+def _color(rng: random.Random, temperature: int) -> dict[str, Any]:
+    return {
+        "temperature": temperature,
+        "background_color": f"#{rng.randrange(0x1000000):06x}",
+        "text_color": "#000000",
+    }
+
+
+def _interval(rng: random.Random, dt: datetime) -> dict[str, Any]:
+    symbol_code = rng.choice(_SYMBOL_CODES)
+    return {
+        "date_time": dt.isoformat(),
+        "symbol_code": symbol_code,
+        "symbol24_code": symbol_code,
+        "PROBPCP_PERCENT": rng.randrange(0, 100, 10),
+        "RRR_MM": round(rng.random() * 3, 1),
+        "FF_KMH": rng.randrange(0, 40),
+        "FX_KMH": rng.randrange(10, 80),
+        "DD_DEG": rng.randrange(-1, 360),
+    }
+
+
+def _hour_interval(rng: random.Random, dt: datetime) -> dict[str, Any]:
+    temperature = rng.randrange(-5, 30)
+    return {
+        **_interval(rng, dt),
+        "TTT_C": temperature,
+        "TTL_C": temperature - 1.5,
+        "TTH_C": temperature + 1.5,
+        "DEWPOINT_C": temperature - 4.2,
+        "RELHUM_PERCENT": rng.randrange(30, 100),
+        "FRESHSNOW_CM": 0,
+        "PRESSURE_HPA": rng.randrange(990, 1030),
+        "SUN_MIN": rng.randrange(0, 61),
+        "IRRADIANCE_WM2": rng.randrange(0, 900),
+        "TTTFEEL_C": temperature - 2,
+        "cur_color": _color(rng, temperature),
+    }
+
+
+def _day_interval(rng: random.Random, dt: datetime) -> dict[str, Any]:
+    low = rng.randrange(-5, 15)
+    high = low + rng.randrange(2, 15)
+    return {
+        **_interval(rng, dt),
+        "SUNRISE": dt.replace(hour=6, minute=12).isoformat(),
+        "SUNSET": dt.replace(hour=20, minute=41).isoformat(),
+        "SUN_H": rng.randrange(0, 14),
+        "TX_C": high,
+        "TN_C": low,
+        "min_color": _color(rng, low),
+        "max_color": _color(rng, high),
+        "UVI": rng.randrange(0, 9),
+    }
+
+
+# (id, latitude, longitude, name, ZIP code) of the places the fake api knows
+_PLACES = (
+    ("47.3769,8.5417", 47.3769, 8.5417, "Zürich", 8001),
+    ("47.3928,8.5099", 47.3928, 8.5099, "Zürich Wipkingen", 8037),
+    ("47.3622,8.5536", 47.3622, 8.5536, "Zürich Hottingen", 8032),
+)
+
+
+def _place(geolocation_id: str) -> tuple[str, float, float, str, int]:
+    for place in _PLACES:
+        if place[0] == geolocation_id:
+            return place
+    # unknown geolocations are in the first place
+    return (geolocation_id, *_PLACES[0][1:])
+
+
+def _bare_geolocation(geolocation_id: str) -> dict[str, Any]:
+    geolocation_id, lat, lon, name, _ = _place(geolocation_id)
+    return {
+        "id": geolocation_id,
+        "lat": lat,
+        "lon": lon,
+        "station_id": "SMA",
+        "timezone": "Europe/Zurich",
+        "default_name": name,
+        "alarm_region_id": "zh",
+        "alarm_region_name": "Zürich",
+        "district": "Zürich",
+    }
+
+
+def geolocation(geolocation_id: str = _PLACES[0][0]) -> dict[str, Any]:
+    _, _, _, name, zip_code = _place(geolocation_id)
+    return {
+        **_bare_geolocation(geolocation_id),
+        "geolocation_names": [
+            {
+                "description_short": name,
+                "description_long": name,
+                "id": str(zip_code),
+                "location_id": str(zip_code),
+                "type": "city",
+                "language": 1,
+                "translation_type": "orig",
+                "name": name,
+                "country": "CH",
+                "province": "ZH",
+                "inhabitants": 421878,
+                "height": 408,
+                "plz": zip_code,
+                "ch": 1,
+            }
+        ],
+    }
+
+
+def geolocations() -> list[dict[str, Any]]:
+    """`geolocations` payload, every known place regardless of the position."""
+    return [geolocation(place[0]) for place in _PLACES]
+
+
+def geolocation_names() -> list[dict[str, Any]]:
+    """`geolocationNames` payload of every known place, the fake api filters it by name or ZIP code."""
+    return [
+        {
+            "district": "Zürich",
+            "id": 1000 + index,
+            "geolocation": _bare_geolocation(geolocation_id),
+            "location_id": zip_code,
+            "type": "city",
+            "default_name": name,
+            "language": "de",
+            "translation_type": "orig",
+            "name": name,
+            "country": "CH",
+            "province": "ZH",
+            "inhabitants": "421878",
+            "height": 408,
+            "ch": "1",
+        }
+        for index, (geolocation_id, _, _, name, zip_code) in enumerate(_PLACES)
+    ]
+
+
+def forecast_week(
+    start: datetime | None = None, *, seed: int = 0, geolocation_id: str | None = None
+) -> dict[str, Any]:
+    """Build a full `forecastpoint` week payload.
+
+    Like the real API it contains two days of hourly intervals followed by three-hourly intervals for the rest of the week.
+    """
+    rng = random.Random(seed)
+    if start is None:
+        start = datetime(2024, 6, 1, tzinfo=_TZ)
+    start = start.astimezone(_TZ).replace(minute=0, second=0, microsecond=0)
+
+    hours = [_hour_interval(rng, start + timedelta(hours=i)) for i in range(1, 49)]
+    three_hours = [
+        _hour_interval(rng, start + timedelta(hours=i))
+        for i in range(51, 7 * 24 + 1, 3)
+    ]
+    first_day = start.replace(hour=0)
+    days = [_day_interval(rng, first_day + timedelta(days=i)) for i in range(8)]
+    return {
+        "days": days,
+        "three_hours": three_hours,
+        "hours": hours,
+        "geolocation": geolocation(*(geolocation_id,) if geolocation_id else ()),
+    }
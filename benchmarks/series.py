@@ -0,0 +1,58 @@
+"""Memory and build time of the columnar forecast store vs. the previous list of dicts.
+
+The columnar store takes less than a third of the memory, but building it is slower: it also merges the `hours` and `three_hours` timelines and interns colors.
+"""
+
+import gc
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from custom_components.srf_weather.forecast import SrfForecastData
+
+from . import legacy
+from .payloads import forecast_week
+
+
+def _measure_memory(build: Callable[[], Any]) -> tuple[Any, int]:
+    """Memory still held by the result of `build`.
+
+    Everything the build released is collected before measuring, otherwise temporary objects that are only freed by a collection count as well.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def main() -> None:
+    payload = forecast_week()
+
+    _, legacy_size = _measure_memory(lambda: legacy.create_from_api(payload))
+    data, columnar_size = _measure_memory(
+        lambda: SrfForecastData.create_from_api(payload)
+    )
+    print(f"{len(data.hourly)} hourly / {len(data.daily)} daily intervals")
+    print(f"{'memory (list of dicts)':<28} {legacy_size / 1024:8.1f} KiB")
+    print(f"{'memory (columnar)':<28} {columnar_size / 1024:8.1f} KiB")
+
+    number = 200
+    cases = {
+        "build (list of dicts)": lambda: legacy.create_from_api(payload),
+        "build (columnar)": lambda: SrfForecastData.create_from_api(payload),
+        "materialize hourly": lambda: list(data.hourly),
+        "restore round-trip": lambda: SrfForecastData.from_dict(data.as_dict()),
+    }
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:<28} {best * 1e6:8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
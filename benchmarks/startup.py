@@ -0,0 +1,166 @@
+"""Startup of many geolocations sharing a credential, against the local fake API.
+
+Every geolocation gets a listener like a weather entity would add, then all due forecasts are fetched through the bulk loader (`Coordinator.async_refresh_due`).
+Reports how long it takes until the first and the last geolocation has data and how many requests the server had to handle at the same time.
+A window of 0 lets all geolocations fetch at once, like every entity fetching on its own.
+
+The event loop is probed while the geolocations load, the lag shows how long it was blocked (e.g. by parsing on the loop) and couldn't run anything else.
+Compare the parse modes to see how much offloading the conversion helps.
+
+    python -m benchmarks.startup --locations 10 50 --window 0 4 8 --latency 0.05
+    python -m benchmarks.startup --locations 50 --window 8 --mode loop executor
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import tempfile
+import time
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+
+from custom_components.srf_weather import api
+from custom_components.srf_weather.cache import ForecastCache
+from custom_components.srf_weather.coordinator import Coordinator, ParseMode
+from custom_components.srf_weather.geolocations import GeolocationIndex
+from custom_components.srf_weather.scheduler import QuotaScheduler
+
+from .fake_api import FakeSrfApi
+
+_PROBE_INTERVAL = 0.001
+
+
+class _LoopLagProbe:
+    """Measures how late the event loop wakes up a task that sleeps for a short interval."""
+
+    def __init__(self) -> None:
+        self.lags: list[float] = []
+        self._task: asyncio.Task[None] | None = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(_PROBE_INTERVAL)
+            self.lags.append(max(time.perf_counter() - start - _PROBE_INTERVAL, 0.0))
+
+    def __enter__(self) -> "_LoopLagProbe":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        assert self._task
+        self._task.cancel()
+
+
+async def _startup(
+    locations: int,
+    *,
+    window: int,
+    mode: ParseMode,
+    latency: float,
+    parse_in_executor_bytes: int,
+) -> None:
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        async with (
+            FakeSrfApi(latency=latency) as server,
+            aiohttp.ClientSession() as session,
+        ):
+            client = api.Client(
+                session,
+                consumer_key=server.consumer_key,
+                consumer_secret=server.consumer_secret,
+                base_url=server.base_url,
+                oauth_url=server.oauth_url,
+            )
+            coordinator = Coordinator(
+                hass,
+                "benchmark",
+                client,
+                QuotaScheduler(client),
+                cache=ForecastCache(hass),
+                geolocations=GeolocationIndex(hass),
+                fetch_window=window or locations,
+                parse_mode=mode,
+                parse_in_executor_bytes=parse_in_executor_bytes,
+            )
+            start = time.perf_counter()
+            arrivals: list[float] = []
+            unsubs = [
+                coordinator.get_forecast_coordinator(
+                    f"47.{i:04d},8.5417"
+                ).async_add_listener(
+                    lambda _: arrivals.append(time.perf_counter() - start)
+                )
+                for i in range(locations)
+            ]
+            with _LoopLagProbe() as probe:
+                await coordinator.async_refresh_due()
+            total = time.perf_counter() - start
+            for unsub in unsubs:
+                unsub()
+
+            assert len(arrivals) == locations, "not every geolocation got data"
+            blocked = client.metrics.as_dict()["histograms"].get(
+                "forecast.loop_blocked_seconds"
+            )
+            parsed_on_loop = blocked["mean"] * blocked["count"] if blocked else 0.0
+            print(
+                f"{locations:>4} locations  window {window or 'all':>4}  "
+                f"{mode:<8}  "
+                f"total {total * 1e3:8.1f} ms  "
+                f"first {arrivals[0] * 1e3:8.1f} ms  "
+                f"median {statistics.median(arrivals) * 1e3:8.1f} ms  "
+                f"peak concurrency {server.peak_in_flight:>4}  "
+                f"loop lag max {max(probe.lags, default=0) * 1e3:6.2f} ms "
+                f"sum {sum(probe.lags) * 1e3:7.2f} ms  "
+                f"parsed on loop {parsed_on_loop * 1e3:7.2f} ms"
+            )
+        await hass.async_stop(force=True)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    for locations in args.locations:
+        for window, mode in itertools.product(args.window, args.mode):
+            await _startup(
+                locations,
+                window=window,
+                mode=mode,
+                latency=args.latency,
+                parse_in_executor_bytes=args.executor_above_kib * 1024,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, nargs="+", default=[10, 50])
+    parser.add_argument(
+        "--window",
+        type=int,
+        nargs="+",
+        default=[0, 4, 8],
+        help="maximum number of concurrent fetches, 0 for unbounded",
+    )
+    parser.add_argument(
+        "--mode",
+        nargs="+",
+        default=["auto"],
+        choices=["auto", "loop", "executor"],
+        help="where the responses are parsed",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="server latency in seconds"
+    )
+    parser.add_argument(
+        "--executor-above-kib",
+        type=int,
+        default=64,
+        help="parse responses at least this large in the executor",
+    )
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
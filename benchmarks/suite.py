@@ -0,0 +1,167 @@
+"""Benchmark suite running on synthetic SRF Meteo payloads.
+
+Covers the conversion pipeline (`SrfForecastData.create_from_api`, forecast lookups, conditions, restore round-trips) and end-to-end fetches against the local fake API.
+Everything runs offline and the inputs are fixed, so results of different revisions can be compared directly.
+
+    python -m benchmarks.suite --locations 1 10 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import timeit
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+import aiohttp
+
+from custom_components.srf_weather import api
+from custom_components.srf_weather.forecast import (
+    SrfForecastData,
+    condition_from_forecast,
+)
+
+from . import payloads
+from .fake_api import FakeSrfApi
+
+
+def _report(name: str, seconds: float) -> None:
+    print(f"{name:<40} {seconds * 1e6:10.1f} µs")
+
+
+def _bench(name: str, fn: Callable[[], Any], *, number: int, repeat: int) -> None:
+    # the minimum is the most stable estimate, everything above it is noise from other processes
+    best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+    _report(name, best)
+
+
+def bench_conversion(*, repeat: int) -> None:
+    forecast_week = payloads.forecast_week()
+    data = SrfForecastData.create_from_api(forecast_week)
+    # halfway through the hourly forecasts, so the lookups have to skip some of them
+    ts = datetime.fromisoformat(data.hourly[len(data.hourly) // 2]["datetime"])
+    ts -= timedelta(minutes=30)
+    intervals = [
+        *forecast_week["hours"],
+        *forecast_week["three_hours"],
+        *forecast_week["days"],
+    ]
+    stored = json.dumps(data.as_dict())
+
+    print(f"# conversion ({len(data.hourly)} hourly / {len(data.daily)} daily)")
+    _bench(
+        "create_from_api",
+        lambda: SrfForecastData.create_from_api(forecast_week),
+        number=200,
+        repeat=repeat,
+    )
+    _bench(
+        "create_from_api (resampled to 1h)",
+        lambda: SrfForecastData.create_from_api(
+            forecast_week, resample_step=timedelta(hours=1)
+        ),
+        number=200,
+        repeat=repeat,
+    )
+    _bench(
+        "_iter_forecasts (hourly)",
+        lambda: list(data.iter_hourly(ts)),
+        number=500,
+        repeat=repeat,
+    )
+    _bench(
+        "_iter_forecasts (daily)",
+        lambda: list(data.iter_daily(ts)),
+        number=500,
+        repeat=repeat,
+    )
+    _bench(
+        f"condition_from_forecast (x{len(intervals)})",
+        lambda: [condition_from_forecast(interval) for interval in intervals],
+        number=1000,
+        repeat=repeat,
+    )
+    _bench(
+        "restore round-trip",
+        lambda: SrfForecastData.from_dict(json.loads(json.dumps(data.as_dict()))),
+        number=200,
+        repeat=repeat,
+    )
+    _bench(
+        "restore from stored json",
+        lambda: SrfForecastData.from_dict(json.loads(stored)),
+        number=200,
+        repeat=repeat,
+    )
+
+
+async def _fetch_locations(server: FakeSrfApi, locations: int) -> list[float]:
+    """Fetch and convert the forecast of `locations` geolocations concurrently with a fresh client.
+
+    Returns the latency of every single location.
+    """
+    async with aiohttp.ClientSession() as session:
+        client = api.Client(
+            session,
+            consumer_key=server.consumer_key,
+            consumer_secret=server.consumer_secret,
+            base_url=server.base_url,
+            oauth_url=server.oauth_url,
+        )
+
+        async def fetch(geolocation_id: str) -> float:
+            start = time.perf_counter()
+            forecast_week = await client.get_forecast_week_by_geo_location(
+                geolocation_id
+            )
+            assert forecast_week is not None
+            SrfForecastData.create_from_api(forecast_week)
+            return time.perf_counter() - start
+
+        return await asyncio.gather(
+            *(fetch(f"47.{i:04d},8.5417") for i in range(locations))
+        )
+
+
+async def bench_end_to_end(locations: list[int], *, repeat: int) -> None:
+    print("# end-to-end fetch (fake api)")
+    async with FakeSrfApi() as server:
+        # warm up the server's response cache and the connection pool
+        await _fetch_locations(server, max(locations))
+        for n in locations:
+            totals: list[float] = []
+            latencies: list[float] = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                latencies.extend(await _fetch_locations(server, n))
+                totals.append(time.perf_counter() - start)
+            latencies.sort()
+            _report(f"{n} locations, total", min(totals))
+            _report(f"{n} locations, p50", statistics.median(latencies))
+            _report(
+                f"{n} locations, p95",
+                latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--locations",
+        type=int,
+        nargs="+",
+        default=[1, 10, 50],
+        help="numbers of concurrently fetched locations",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bench_conversion(repeat=args.repeat)
+    asyncio.run(bench_end_to_end(args.locations, repeat=args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Forecast lookups: bisect timeline index vs. the previous linear ISO parsing scan."""
+
+import timeit
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta
+
+from custom_components.srf_weather.forecast import ForecastSrf, SrfForecastData
+
+from .payloads import forecast_week
+
+
+def _iter_forecasts_linear(
+    forecasts: Iterable[ForecastSrf], ts: datetime
+) -> Iterator[ForecastSrf]:
+    it = iter(forecasts)
+    for forecast in it:
+        ends_at = datetime.fromisoformat(forecast["datetime"])
+        if ts < ends_at:
+            yield forecast
+            break
+    yield from it
+
+
+def main() -> None:
+    data = SrfForecastData.create_from_api(forecast_week())
+    # somewhere in the middle of the week, so both implementations have to skip entries
+    ts = datetime.fromisoformat(data.hourly[len(data.hourly) // 2]["datetime"])
+    ts -= timedelta(minutes=30)
+    assert list(data.iter_hourly(ts)) == list(_iter_forecasts_linear(data.hourly, ts))
+
+    number = 2000
+    cases = {
+        "get_forecast (linear)": lambda: next(
+            _iter_forecasts_linear(data.hourly, ts), None
+        ),
+        "get_forecast (bisect)": lambda: data.get_forecast(ts),
+        "iter_hourly (linear)": lambda: list(_iter_forecasts_linear(data.hourly, ts)),
+        "iter_hourly (bisect)": lambda: list(data.iter_hourly(ts)),
+        "iter_daily (linear)": lambda: list(_iter_forecasts_linear(data.daily, ts)),
+        "iter_daily (bisect)": lambda: list(data.iter_daily(ts)),
+    }
+    print(f"{len(data.hourly)} hourly / {len(data.daily)} daily intervals")
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:<24} {best * 1e6:8.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,55 @@
 import logging
+from datetime import timedelta
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
+from .cache import get_forecast_cache
+from .const import (
+    CONF_GEOLOCATION_ID,
+    CONF_KEEP_ELAPSED_HOURS,
+    CONF_RESAMPLE_HOURS,
+    DEFAULT_KEEP_ELAPSED_HOURS,
+    DEFAULT_RESAMPLE_HOURS,
+)
+from .coordinator import get_coordinator
+
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = ["weather"]
+PLATFORMS = ["weather", "sensor"]
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    forecast = get_coordinator(hass, entry.data).get_forecast_coordinator(
+        entry.data[CONF_GEOLOCATION_ID]
+    )
+    forecast.keep_elapsed = timedelta(
+        hours=entry.options.get(CONF_KEEP_ELAPSED_HOURS, DEFAULT_KEEP_ELAPSED_HOURS)
+    )
+    resample_hours = entry.options.get(CONF_RESAMPLE_HOURS, DEFAULT_RESAMPLE_HOURS)
+    # the forecast coordinator outlives reloads, changing the step fetches its data again
+    forecast.set_resample_step(
+        timedelta(hours=resample_hours) if resample_hours else None
+    )
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     return ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await get_forecast_cache(hass).async_remove(entry.data[CONF_GEOLOCATION_ID])
+
+
 async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     _LOGGER.debug("migrating from version %s", config_entry.version)
 
@@ -1,14 +1,32 @@
+import asyncio
+import collections
 import dataclasses
+import hashlib
 import logging
-from collections.abc import Mapping
+import random
+from collections.abc import Callable, Mapping
 from datetime import datetime, timedelta, timezone
-from typing import Any, Literal, Required, TypedDict
+from http import HTTPStatus
+from typing import Any, Literal, Protocol, Required, TypedDict, TypeVar, overload
 
 import aiohttp
+from aiohttp import hdrs
 from yarl import URL
 
+from .metrics import Metrics
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
+JsonDecoder = Callable[[bytes], Any]
+"""Decodes the raw body of a response."""
+
 
 class Color(TypedDict, total=False):
     temperature: Required[int]
@@ -171,102 +189,522 @@ class Ratelimit:
         return cls(allowed=allowed, available=available, reset_time=reset_time)
 
 
+@dataclasses.dataclass(slots=True, kw_only=True)
+class AuthToken:
+    authorization_header: str
+    expires_at: datetime
+    refresh_at: datetime
+    """the token is refreshed proactively after this time, even though it's still valid"""
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "authorization_header": self.authorization_header,
+            "expires_at": self.expires_at.isoformat(),
+            "refresh_at": self.refresh_at.isoformat(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "AuthToken":
+        return cls(
+            authorization_header=data["authorization_header"],
+            expires_at=datetime.fromisoformat(data["expires_at"]),
+            refresh_at=datetime.fromisoformat(data["refresh_at"]),
+        )
+
+
+class TokenStore(Protocol):
+    """Persists the access token so it survives restarts."""
+
+    async def async_load(self) -> AuthToken | None: ...
+
+    async def async_save(self, token: AuthToken | None) -> None: ...
+
+
 _DEFAULT_OAUTH_URL = URL("https://api.srgssr.ch/oauth/v1/accesstoken")
 
+_TOKEN_EXPIRY_MARGIN = timedelta(seconds=10)
+_TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
 
 class OauthClient:
     def __init__(
-        self, session: aiohttp.ClientSession, *, consumer_auth: aiohttp.BasicAuth
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        consumer_auth: aiohttp.BasicAuth,
+        token_store: TokenStore | None = None,
+        url: URL = _DEFAULT_OAUTH_URL,
+        metrics: Metrics | None = None,
     ) -> None:
         self._session = session
         self._consumer_auth = consumer_auth
-        self._url = _DEFAULT_OAUTH_URL
+        self._url = url
+        self._token_store = token_store
+        self._metrics = metrics or Metrics()
 
-        self._auth_expire_at: datetime | None = None
-        self._auth_header: str = ""
+        self._token: AuthToken | None = None
+        self._token_loaded = token_store is None
+        # only a single token request may be in-flight at any time
+        self._lock = asyncio.Lock()
 
     async def _get_access_token(self) -> AccessToken:
         _LOGGER.debug("getting access token")
-        async with self._session.post(
-            self._url,
-            params={"grant_type": "client_credentials"},
-            auth=self._consumer_auth,
-            headers={"Accept": "application/json"},
-            raise_for_status=True,
-        ) as resp:
-            data = await resp.json(content_type=None)
-            _LOGGER.debug("json response: %s", data)
-            return data
+        self._metrics.increment("oauth.token_requests")
+        try:
+            with self._metrics.time("oauth.token_seconds"):
+                async with self._session.post(
+                    self._url,
+                    params={"grant_type": "client_credentials"},
+                    auth=self._consumer_auth,
+                    headers={"Accept": "application/json"},
+                    raise_for_status=True,
+                ) as resp:
+                    data = await resp.json(content_type=None)
+        except Exception:
+            self._metrics.increment("oauth.token_failures")
+            raise
+        # don't log the token itself
+        _LOGGER.debug("got access token expiring in %s seconds", data.get("expires_in"))
+        return data
 
-    async def _ensure_authorization(self) -> Any:
+    def _get_fresh_token(self) -> AuthToken | None:
         now = datetime.now(tz=timezone.utc)
-        if self._auth_expire_at and now < self._auth_expire_at:
-            # auth is still valid
+        if self._token and now < self._token.refresh_at:
+            return self._token
+        return None
+
+    async def _ensure_authorization(self) -> AuthToken:
+        if token := self._get_fresh_token():
+            return token
+
+        async with self._lock:
+            if not self._token_loaded:
+                assert self._token_store  # loaded is only false with a store
+                self._token_loaded = True
+                try:
+                    self._token = await self._token_store.async_load()
+                except Exception as exc:
+                    _LOGGER.warning("failed to load access token", exc_info=exc)
+                if token := self._get_fresh_token():
+                    _LOGGER.debug("restored access token")
+                    return token
+
+            if token := self._get_fresh_token():
+                # refreshed by another request while we were waiting for the lock
+                return token
+
+            now = datetime.now(tz=timezone.utc)
+            try:
+                access_token = await self._get_access_token()
+            except Exception as exc:
+                if not self._token or now >= self._token.expires_at:
+                    raise
+                # the refresh is only proactive, the current token is still good for a while
+                _LOGGER.warning(
+                    "failed to refresh access token, using the current one until it expires at %s",
+                    self._token.expires_at,
+                    exc_info=exc,
+                )
+                return self._token
+            expires_in = timedelta(seconds=access_token["expires_in"])
+            # short-lived tokens are refreshed halfway through their lifetime
+            refresh_in = max(expires_in - _TOKEN_REFRESH_MARGIN, expires_in / 2)
+            token = self._token = AuthToken(
+                authorization_header=f"{access_token['token_type']} {access_token['access_token']}",
+                expires_at=now + expires_in - _TOKEN_EXPIRY_MARGIN,
+                refresh_at=now + refresh_in,
+            )
+            await self._save_token()
+            return token
+
+    async def _save_token(self) -> None:
+        if not self._token_store:
             return
+        try:
+            await self._token_store.async_save(self._token)
+        except Exception as exc:
+            _LOGGER.warning("failed to save access token", exc_info=exc)
 
-        access_token = await self._get_access_token()
-        self._auth_expire_at = (
-            now + timedelta(seconds=access_token["expires_in"]) - timedelta(seconds=10)
-        )
-        self._auth_header = (
-            f"{access_token['token_type']} {access_token['access_token']}"
-        )
+    async def invalidate(self, authorization_header: str) -> None:
+        """Invalidate the token, unless it has already been replaced."""
+        if self._token and self._token.authorization_header == authorization_header:
+            _LOGGER.debug("invalidating access token")
+            self._token = None
+            await self._save_token()
 
     async def get_authorization_header(self) -> str:
-        await self._ensure_authorization()
-        return self._auth_header
+        token = await self._ensure_authorization()
+        return token.authorization_header
+
+
+@dataclasses.dataclass(slots=True, kw_only=True)
+class _Validators:
+    """Validators of the last response for a URL, used for conditional requests."""
+
+    etag: str | None
+    last_modified: str | None
+    digest: bytes
+    """hash of the response body, for when the server doesn't support conditional requests"""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of performing a request while the circuit breaker is open."""
+
+    def __init__(self, open_until: datetime) -> None:
+        super().__init__(f"api unavailable, circuit breaker open until {open_until}")
+        self.open_until = open_until
+
+
+class CircuitBreaker:
+    """Stops all requests while the upstream API is down.
+
+    The breaker opens after `failure_threshold` consecutive failed requests, a request counts once no matter how often it was retried.
+    Every time it opens again without a success in between, the cooldown is doubled up to `max_cooldown`.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 3,
+        cooldown: timedelta = timedelta(minutes=1),
+        max_cooldown: timedelta = timedelta(hours=1),
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._max_cooldown = max_cooldown
+
+        self._failures = 0
+        self._trips = 0
+        self._open_until: datetime | None = None
+
+    @property
+    def open_until(self) -> datetime | None:
+        """Time until which requests are blocked, `None` if the breaker is closed."""
+        if self._open_until and datetime.now(tz=timezone.utc) < self._open_until:
+            return self._open_until
+        return None
+
+    def check(self) -> None:
+        if open_until := self.open_until:
+            raise CircuitOpenError(open_until)
+
+    def record_success(self) -> None:
+        if self._trips:
+            _LOGGER.info("api available again, circuit breaker closed")
+        self._failures = 0
+        self._trips = 0
+        self._open_until = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._failures < self._failure_threshold:
+            return
+
+        cooldown = min(self._cooldown * 2**self._trips, self._max_cooldown)
+        self._failures = 0
+        self._trips += 1
+        self.open(datetime.now(tz=timezone.utc) + cooldown)
+
+    def open(self, until: datetime) -> None:
+        if self._open_until and until <= self._open_until:
+            return
+        _LOGGER.warning("api unavailable, circuit breaker open until %s", until)
+        self._open_until = until
+
+
+@dataclasses.dataclass(slots=True, kw_only=True)
+class RetryPolicy:
+    attempts: int = 3
+    backoff: timedelta = timedelta(seconds=2)
+    """delay before the first retry, doubled for every retry after that"""
+    max_backoff: timedelta = timedelta(seconds=30)
+    max_ratelimit_wait: timedelta = timedelta(minutes=1)
+    """rate limited requests are only retried if the rate limit resets within this time"""
+
+    def get_backoff(self, attempt: int) -> float:
+        delay = min(self.backoff * 2**attempt, self.max_backoff).total_seconds()
+        # full jitter, so requests that failed together don't retry together
+        return random.uniform(0, delay)
+
+
+def _is_transient_error(exc: Exception) -> bool:
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status >= HTTPStatus.INTERNAL_SERVER_ERROR
+    return isinstance(exc, aiohttp.ClientError | asyncio.TimeoutError)
 
 
 _DEFAULT_API_BASE_URL = URL("https://api.srgssr.ch/srf-meteo/v2")
+_DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30)
+# window of `Client.calls_last_hour`
+_CALLS_WINDOW = timedelta(hours=1)
 
 
 class Client:
     def __init__(
-        self, session: aiohttp.ClientSession, *, consumer_key: str, consumer_secret: str
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        consumer_key: str,
+        consumer_secret: str,
+        token_store: TokenStore | None = None,
+        json_decoder: JsonDecoder = json_loads,
+        base_url: URL = _DEFAULT_API_BASE_URL,
+        oauth_url: URL = _DEFAULT_OAUTH_URL,
     ) -> None:
         self._session = session
-        self._base_url = _DEFAULT_API_BASE_URL
+        self._base_url = base_url
+        self._json_decoder = json_decoder
+        self.metrics = Metrics()
 
         self._oauth = OauthClient(
-            session, consumer_auth=aiohttp.BasicAuth(consumer_key, consumer_secret)
+            session,
+            consumer_auth=aiohttp.BasicAuth(consumer_key, consumer_secret),
+            token_store=token_store,
+            url=oauth_url,
+            metrics=self.metrics,
         )
         self._ratelimit: Ratelimit | None = None
+        self._validators: dict[URL, _Validators] = {}
+        self._retry_policy = RetryPolicy()
+        self._circuit_breaker = CircuitBreaker()
+        # every api call counts against the quota, these are the ones of the last hour
+        self._call_times: collections.deque[datetime] = collections.deque()
 
     async def _request(
-        self, method: Literal["GET"], path: str, *, params: dict[str, Any] | None = None
+        self,
+        method: Literal["GET"],
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        store_validators: bool = False,
+        if_changed: bool = False,
+        decoder: JsonDecoder | None = None,
     ) -> Any:
+        """Perform a request.
+
+        With `store_validators` the validators (ETag, Last-Modified, body hash) of the response are remembered for the URL.
+        With `if_changed` they are used to make a conditional request and `None` is returned if the response is unchanged.
+        The body of successful responses is decoded with `decoder`, defaulting to the json decoder of the client.
+        """
+        decode = decoder or self._json_decoder
+        # metrics are recorded per endpoint, not per geolocation
+        endpoint = path.partition("/")[0]
+        metrics = self.metrics
         url = self._base_url / path
-        kwargs = {}
-        kwargs["headers"] = headers = {"Accept": "application/json"}
         if params:
-            kwargs["params"] = params
+            url = url.with_query(params)
+
+        kwargs: dict[str, Any] = {"timeout": _DEFAULT_TIMEOUT}
+        kwargs["headers"] = headers = {"Accept": "application/json"}
 
-        async def once() -> Any:
-            headers["Authorization"] = await self._oauth.get_authorization_header()
+        validators = self._validators.get(url) if if_changed else None
+        if validators:
+            if validators.etag:
+                headers[hdrs.IF_NONE_MATCH] = validators.etag
+            if validators.last_modified:
+                headers[hdrs.IF_MODIFIED_SINCE] = validators.last_modified
+
+        async def once(*, retry_unauthorized: bool = True) -> Any:
+            authorization_header = await self._oauth.get_authorization_header()
+            headers["Authorization"] = authorization_header
             _LOGGER.debug(
                 "performing %s request on %s with params %s", method, path, params
             )
-            async with self._session.request(method, url, **kwargs) as resp:
+            metrics.increment(f"request.{endpoint}.attempts")
+            now = datetime.now(tz=timezone.utc)
+            self._prune_call_times(now)
+            self._call_times.append(now)
+            with metrics.time(f"request.{endpoint}.latency_seconds", path=path):
+                async with self._session.request(method, url, **kwargs) as resp:
+                    metrics.increment(
+                        f"request.{endpoint}.status.{resp.status}", path=path
+                    )
+                    if resp.status != HTTPStatus.UNAUTHORIZED or not retry_unauthorized:
+                        return await handle_response(resp)
+
+            # the token was revoked or expired early, get a new one and try exactly once more
+            _LOGGER.debug("request unauthorized, retrying with a new access token")
+            await self._oauth.invalidate(authorization_header)
+            return await once(retry_unauthorized=False)
+
+        async def handle_response(resp: aiohttp.ClientResponse) -> Any:
+            if "x-ratelimit-available" in resp.headers:
                 self._ratelimit = Ratelimit.from_response_headers(resp.headers)
-                data = await resp.json(content_type=None)
-                _LOGGER.debug("json response: %s", data)
+            if validators and resp.status == 304:
+                _LOGGER.debug("not modified: %s", path)
+                metrics.increment(f"request.{endpoint}.unchanged")
+                return None
+
+            body = await resp.read()
+            metrics.record(f"request.{endpoint}.response_bytes", len(body), path=path)
+            new_validators = None
+            if store_validators and resp.ok:
+                new_validators = _Validators(
+                    etag=resp.headers.get(hdrs.ETAG),
+                    last_modified=resp.headers.get(hdrs.LAST_MODIFIED),
+                    digest=hashlib.blake2b(body, digest_size=16).digest(),
+                )
+                if validators and validators.digest == new_validators.digest:
+                    _LOGGER.debug("response body unchanged: %s", path)
+                    metrics.increment(f"request.{endpoint}.unchanged")
+                    self._validators[url] = new_validators
+                    return None
+
+            if not resp.ok:
+                _LOGGER.debug("error response: %s", body)
                 resp.raise_for_status()
-                return data
+            with metrics.time(f"request.{endpoint}.decode_seconds"):
+                data = decode(body) if body else None
+            _LOGGER.debug("json response: %s", data)
+            if new_validators:
+                # only once the body is decoded, the next conditional request would skip it otherwise
+                self._validators[url] = new_validators
+            return data
 
         _LOGGER.debug("ratelimit: %s", self._ratelimit)
-        return await once()
+        attempts = self._retry_policy.attempts
+        for attempt in range(attempts):
+            try:
+                self._circuit_breaker.check()
+            except CircuitOpenError:
+                metrics.increment(f"request.{endpoint}.circuit_open")
+                raise
+            try:
+                data = await once()
+            except Exception as exc:
+                delay = self._get_retry_delay(exc, attempt)
+                if delay is None or attempt + 1 >= attempts:
+                    if _is_transient_error(exc):
+                        # however often it was retried, a request only counts as one failure
+                        self._circuit_breaker.record_failure()
+                    metrics.increment(f"request.{endpoint}.failures")
+                    raise
+                metrics.increment(f"request.{endpoint}.retries")
+                _LOGGER.debug(
+                    "request on %s failed (%r), retrying in %.1f seconds",
+                    path,
+                    exc,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+            else:
+                self._circuit_breaker.record_success()
+                return data
+
+        raise AssertionError("unreachable")
+
+    def _get_retry_delay(self, exc: Exception, attempt: int) -> float | None:
+        """Get the delay in seconds before retrying a failed request, `None` if it shouldn't be retried."""
+        if (
+            isinstance(exc, aiohttp.ClientResponseError)
+            and exc.status == HTTPStatus.TOO_MANY_REQUESTS
+        ):
+            return self._get_ratelimit_wait()
+
+        if not _is_transient_error(exc):
+            return None
+        return self._retry_policy.get_backoff(attempt)
+
+    def _get_ratelimit_wait(self) -> float | None:
+        if not self._ratelimit:
+            return None
+        wait = self._ratelimit.reset_time - datetime.now(tz=timezone.utc)
+        if wait <= timedelta(0):
+            # the reset time header was missing or is already over, there's nothing to wait for
+            return None
+        if wait <= self._retry_policy.max_ratelimit_wait:
+            return wait.total_seconds()
+        # quota exhausted, no point in trying again before the reset
+        self._circuit_breaker.open(self._ratelimit.reset_time)
+        return None
+
+    @property
+    def circuit_open_until(self) -> datetime | None:
+        """Requests are blocked until this time because the API is unavailable."""
+        return self._circuit_breaker.open_until
 
     @property
     def ratelimit(self) -> Ratelimit | None:
         return self._ratelimit
 
+    @property
+    def json_decoder(self) -> JsonDecoder:
+        """Decoder of json response bodies, also used for bodies that are decoded outside of the client."""
+        return self._json_decoder
+
+    @property
+    def calls_last_hour(self) -> int:
+        """Number of api calls made in the last hour."""
+        self._prune_call_times(datetime.now(tz=timezone.utc))
+        return len(self._call_times)
+
+    @property
+    def next_status_change(self) -> datetime | None:
+        """Next time `calls_last_hour` or `circuit_open_until` change without an api call, `None` if they don't."""
+        self._prune_call_times(datetime.now(tz=timezone.utc))
+        changes: list[datetime] = []
+        if self._call_times:
+            # the oldest call leaves the window
+            changes.append(self._call_times[0] + _CALLS_WINDOW)
+        if open_until := self.circuit_open_until:
+            changes.append(open_until)
+        return min(changes, default=None)
+
+    def _prune_call_times(self, now: datetime) -> None:
+        since = now - _CALLS_WINDOW
+        while self._call_times and self._call_times[0] <= since:
+            self._call_times.popleft()
+
     async def attemp_auth(self) -> None:
         await self._oauth.get_authorization_header()
 
+    @overload
+    async def get_forecast_week_by_geo_location(
+        self, geolocation_id: str, *, if_changed: bool = False
+    ) -> ForecastPointWeek | None: ...
+
+    @overload
+    async def get_forecast_week_by_geo_location(
+        self,
+        geolocation_id: str,
+        *,
+        if_changed: bool = False,
+        decoder: Callable[[bytes], _T],
+    ) -> _T | None: ...
+
+    def can_detect_forecast_changes(self, geolocation_id: str) -> bool:
+        """Whether `get_forecast_week_by_geo_location` with `if_changed` can tell if the forecast changed.
+
+        That requires the validators of a previous response, they're only kept in memory.
+        """
+        return self._base_url / f"forecastpoint/{geolocation_id}" in self._validators
+
+    def discard_forecast_validators(self, geolocation_id: str) -> None:
+        """Forget the validators of the last forecast response, so the next request with `if_changed` gets the forecast in full.
+
+        Use this if the body returned by a custom `decoder` couldn't be processed.
+        """
+        self._validators.pop(self._base_url / f"forecastpoint/{geolocation_id}", None)
+
     async def get_forecast_week_by_geo_location(
-        self, geolocation_id: str
-    ) -> ForecastPointWeek:
-        return await self._request("GET", f"forecastpoint/{geolocation_id}")
+        self,
+        geolocation_id: str,
+        *,
+        if_changed: bool = False,
+        decoder: JsonDecoder | None = None,
+    ) -> Any:
+        """Get the week forecast for a geolocation.
+
+        With `if_changed`, `None` is returned if the forecast hasn't changed since the last call.
+        With `decoder`, the raw response body is passed to it instead of being decoded as json.
+        """
+        return await self._request(
+            "GET",
+            f"forecastpoint/{geolocation_id}",
+            store_validators=True,
+            if_changed=if_changed,
+            decoder=decoder,
+        )
 
     async def get_geolocations(self, lat: str, lon: str) -> list[Geolocation]:
         return await self._request(
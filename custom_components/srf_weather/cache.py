@@ -0,0 +1,187 @@
+import asyncio
+import dataclasses
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from . import api, const
+from .forecast import SrfForecastData
+
+_LOGGER = logging.getLogger(__name__)
+
+_STORAGE_VERSION = 1
+_STORAGE_KEY = f"{const.DOMAIN}.forecast_cache"
+_TOKEN_STORAGE_KEY = f"{const.DOMAIN}.auth"
+_SAVE_DELAY = 30  # seconds
+
+
+@dataclasses.dataclass(slots=True, kw_only=True)
+class CachedForecast:
+    data: SrfForecastData
+    fetched_at: datetime
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"data": self.data.as_dict(), "fetched_at": self.fetched_at.isoformat()}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "CachedForecast":
+        return cls(
+            data=SrfForecastData.from_dict(data["data"]),
+            fetched_at=datetime.fromisoformat(data["fetched_at"]),
+        )
+
+
+class ForecastCache:
+    """On-disk cache of the latest forecast data, keyed by geolocation id.
+
+    A single cache exists per Home Assistant instance. Use `get_forecast_cache` to get it.
+
+    The cache lets the forecast coordinators serve data immediately after a restart without spending API calls.
+    Stored entries are only converted when they're first requested, forecasts are only serialized when the cache is saved.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._store: Store[dict[str, Any]] = Store(hass, _STORAGE_VERSION, _STORAGE_KEY)
+        self._entries: dict[str, CachedForecast | dict[str, Any]] | None = None
+        self._load_lock = asyncio.Lock()
+
+    async def _async_load(self) -> dict[str, CachedForecast | dict[str, Any]]:
+        async with self._load_lock:
+            if self._entries is None:
+                stored = await self._store.async_load()
+                self._entries = (stored or {}).get("forecasts", {})
+                _LOGGER.debug("loaded %s cached forecasts", len(self._entries))
+        return self._entries
+
+    async def async_get(self, geolocation_id: str) -> CachedForecast | None:
+        entries = await self._async_load()
+        try:
+            entry = entries[geolocation_id]
+        except LookupError:
+            return None
+        if isinstance(entry, CachedForecast):
+            return entry
+        try:
+            cached = CachedForecast.from_dict(entry)
+        except Exception as exc:
+            _LOGGER.warning(
+                "ignoring invalid cached forecast for geolocation %s",
+                geolocation_id,
+                exc_info=exc,
+            )
+            return None
+        entries[geolocation_id] = cached
+        return cached
+
+    async def async_set(self, geolocation_id: str, cached: CachedForecast) -> None:
+        entries = await self._async_load()
+        entries[geolocation_id] = cached
+        self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    async def async_remove(self, geolocation_id: str) -> None:
+        entries = await self._async_load()
+        if entries.pop(geolocation_id, None) is not None:
+            self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "forecasts": {
+                geolocation_id: entry.as_dict()
+                if isinstance(entry, CachedForecast)
+                else entry
+                for geolocation_id, entry in (self._entries or {}).items()
+            }
+        }
+
+
+class TokenCache:
+    """On-disk cache of the OAuth access tokens, keyed by credentials.
+
+    A single cache exists per Home Assistant instance. Use `get_token_store` to get the store for a set of credentials.
+
+    The store is private (only readable by the owner) and only keeps a hash of the credentials.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._store: Store[dict[str, Any]] = Store(
+            hass, _STORAGE_VERSION, _TOKEN_STORAGE_KEY, private=True
+        )
+        self._tokens: dict[str, dict[str, Any]] | None = None
+        self._load_lock = asyncio.Lock()
+
+    async def _async_load(self) -> dict[str, dict[str, Any]]:
+        async with self._load_lock:
+            if self._tokens is None:
+                stored = await self._store.async_load()
+                self._tokens = (stored or {}).get("tokens", {})
+        return self._tokens
+
+    async def async_get(self, credentials_id: str) -> api.AuthToken | None:
+        tokens = await self._async_load()
+        try:
+            return api.AuthToken.from_dict(tokens[credentials_id])
+        except LookupError:
+            return None
+
+    async def async_set(self, credentials_id: str, token: api.AuthToken | None) -> None:
+        tokens = await self._async_load()
+        if token:
+            tokens[credentials_id] = token.as_dict()
+        elif tokens.pop(credentials_id, None) is None:
+            return
+        self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {"tokens": self._tokens or {}}
+
+
+@dataclasses.dataclass(slots=True)
+class _CredentialsTokenStore:
+    cache: TokenCache
+    credentials_id: str
+
+    async def async_load(self) -> api.AuthToken | None:
+        return await self.cache.async_get(self.credentials_id)
+
+    async def async_save(self, token: api.AuthToken | None) -> None:
+        await self.cache.async_set(self.credentials_id, token)
+
+
+_DATA_FORECAST_CACHE = "forecast_cache"
+_DATA_TOKEN_CACHE = "token_cache"
+
+
+def get_forecast_cache(hass: HomeAssistant) -> ForecastCache:
+    domain_data = hass.data.setdefault(const.DOMAIN, {})
+    try:
+        return domain_data[_DATA_FORECAST_CACHE]
+    except LookupError:
+        pass
+
+    cache = domain_data[_DATA_FORECAST_CACHE] = ForecastCache(hass)
+    return cache
+
+
+def get_token_store(
+    hass: HomeAssistant, consumer_key: str, consumer_secret: str
+) -> api.TokenStore:
+    domain_data = hass.data.setdefault(const.DOMAIN, {})
+    try:
+        cache = domain_data[_DATA_TOKEN_CACHE]
+    except LookupError:
+        cache = domain_data[_DATA_TOKEN_CACHE] = TokenCache(hass)
+
+    return _CredentialsTokenStore(
+        cache, get_credentials_id(consumer_key, consumer_secret)
+    )
+
+
+def get_credentials_id(consumer_key: str, consumer_secret: str) -> str:
+    """Stable identifier of a credential that doesn't reveal it."""
+    return hashlib.sha256(f"{consumer_key}:{consumer_secret}".encode()).hexdigest()
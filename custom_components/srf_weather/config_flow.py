@@ -2,19 +2,33 @@ import logging
 from typing import Any
 
 import voluptuous as vol
-from homeassistant.config_entries import ConfigFlow
-from homeassistant.const import CONF_BASE
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
+from homeassistant.const import CONF_BASE, CONF_NAME
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.selector import (
+    NumberSelector,
+    NumberSelectorConfig,
+    NumberSelectorMode,
     TextSelector,
     TextSelectorConfig,
     TextSelectorType,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
 from . import api
 from .coordinator import get_coordinator, Coordinator
-from .const import CONF_CONSUMER_KEY, CONF_CONSUMER_SECRET, CONF_GEOLOCATION_ID, DOMAIN
+from .const import (
+    CONF_CONSUMER_KEY,
+    CONF_CONSUMER_SECRET,
+    CONF_GEOLOCATION_ID,
+    CONF_INTERPOLATE_MINUTES,
+    CONF_KEEP_ELAPSED_HOURS,
+    CONF_RESAMPLE_HOURS,
+    DEFAULT_INTERPOLATE_MINUTES,
+    DEFAULT_KEEP_ELAPSED_HOURS,
+    DEFAULT_RESAMPLE_HOURS,
+    DOMAIN,
+)
 from .helpers import get_geolocation_description
 
 _LOGGER = logging.getLogger(__name__)
@@ -43,6 +57,11 @@ class SrfMeteoConfigFlow(ConfigFlow, domain=DOMAIN):
 
     VERSION = 2
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        return SrfMeteoOptionsFlow()
+
     def __init__(self) -> None:
         self._data: dict[str, Any] = {}
         self._coordinator: Coordinator | None = None
@@ -94,7 +113,8 @@ class SrfMeteoConfigFlow(ConfigFlow, domain=DOMAIN):
     ) -> FlowResult:
         """Step 1.5: let the user pick how to search for the geolocation"""
         return self.async_show_menu(
-            step_id="search_menu", menu_options=["search_ha_home", "search_zip"]
+            step_id="search_menu",
+            menu_options=["search_ha_home", "search_zip", "search_name"],
         )
 
     async def async_step_search_ha_home(
@@ -104,8 +124,8 @@ class SrfMeteoConfigFlow(ConfigFlow, domain=DOMAIN):
         assert self._coordinator  # step 1 will set the client
 
         try:
-            self._geolocations = await self._coordinator.client.get_geolocations(
-                str(self.hass.config.latitude), str(self.hass.config.longitude)
+            self._geolocations = await self._coordinator.async_get_geolocations(
+                self.hass.config.latitude, self.hass.config.longitude
             )
         except Exception as exc:
             _LOGGER.warn("failed to get geolocations in config flow", exc_info=exc)
@@ -134,7 +154,7 @@ class SrfMeteoConfigFlow(ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             zip_code = user_input[CONF_ZIP_CODE]
             try:
-                results = await self._coordinator.client.search_geolocation(
+                self._geolocations = await self._coordinator.async_search_geolocations(
                     zip=zip_code,
                     limit=30,
                 )
@@ -142,9 +162,7 @@ class SrfMeteoConfigFlow(ConfigFlow, domain=DOMAIN):
                 _LOGGER.warn(
                     "failed to search geolocations in config flow", exc_info=exc
                 )
-                results = []
-
-            self._geolocations = [result["geolocation"] for result in results]
+                self._geolocations = []
 
             if self._geolocations:
                 return await self.async_step_choose_geolocation()
@@ -157,6 +175,38 @@ class SrfMeteoConfigFlow(ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
+    async def async_step_search_name(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Step 2c: discover geolocations by name"""
+        assert self._coordinator  # step 1 will set the client
+
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            name = user_input[CONF_NAME]
+            try:
+                self._geolocations = await self._coordinator.async_search_geolocations(
+                    name=name,
+                    limit=30,
+                )
+            except Exception as exc:
+                _LOGGER.warn(
+                    "failed to search geolocations in config flow", exc_info=exc
+                )
+                self._geolocations = []
+
+            if self._geolocations:
+                return await self.async_step_choose_geolocation()
+            else:
+                errors[CONF_BASE] = ERROR_NO_GEOLOCATION_FOUND
+
+        return self.async_show_form(
+            step_id="search_name",
+            data_schema=vol.Schema({vol.Required(CONF_NAME): str}),
+            errors=errors,
+        )
+
     async def async_step_choose_geolocation(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -195,3 +245,67 @@ class SrfMeteoConfigFlow(ConfigFlow, domain=DOMAIN):
             ),
             errors=errors,
         )
+
+
+class SrfMeteoOptionsFlow(OptionsFlow):
+    """SRF-Meteo options flow."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                vol.Schema(
+                    {
+                        vol.Required(
+                            CONF_KEEP_ELAPSED_HOURS, default=DEFAULT_KEEP_ELAPSED_HOURS
+                        ): vol.All(
+                            NumberSelector(
+                                NumberSelectorConfig(
+                                    min=0,
+                                    max=24,
+                                    step=1,
+                                    unit_of_measurement="h",
+                                    mode=NumberSelectorMode.BOX,
+                                )
+                            ),
+                            vol.Coerce(int),
+                        ),
+                        vol.Required(
+                            CONF_RESAMPLE_HOURS, default=DEFAULT_RESAMPLE_HOURS
+                        ): vol.All(
+                            NumberSelector(
+                                NumberSelectorConfig(
+                                    min=0,
+                                    max=6,
+                                    step=1,
+                                    unit_of_measurement="h",
+                                    mode=NumberSelectorMode.BOX,
+                                )
+                            ),
+                            vol.Coerce(int),
+                        ),
+                        vol.Required(
+                            CONF_INTERPOLATE_MINUTES,
+                            default=DEFAULT_INTERPOLATE_MINUTES,
+                        ): vol.All(
+                            NumberSelector(
+                                NumberSelectorConfig(
+                                    min=0,
+                                    max=60,
+                                    step=1,
+                                    unit_of_measurement="min",
+                                    mode=NumberSelectorMode.BOX,
+                                )
+                            ),
+                            vol.Coerce(int),
+                        ),
+                    }
+                ),
+                self.config_entry.options,
+            ),
+        )
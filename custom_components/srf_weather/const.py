@@ -3,3 +3,12 @@ DOMAIN = "srf_weather"
 CONF_CONSUMER_KEY = "consumer_key"
 CONF_CONSUMER_SECRET = "consumer_secret"
 CONF_GEOLOCATION_ID = "geolocation_id"
+
+CONF_KEEP_ELAPSED_HOURS = "keep_elapsed_hours"
+DEFAULT_KEEP_ELAPSED_HOURS = 1
+# length of the resampled hourly forecasts, 0 keeps the intervals of the api
+CONF_RESAMPLE_HOURS = "resample_hours"
+DEFAULT_RESAMPLE_HOURS = 0
+# how often the interpolated current values are updated, 0 uses the values of the current forecast
+CONF_INTERPOLATE_MINUTES = "interpolate_minutes"
+DEFAULT_INTERPOLATE_MINUTES = 0
@@ -1,18 +1,44 @@
+import asyncio
 import dataclasses
+import functools
 import logging
-import math
-from collections.abc import Mapping
+import time
+from collections.abc import Callable, Mapping
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Literal
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import (
+    async_track_point_in_utc_time,
+    async_track_time_interval,
+)
+from homeassistant.helpers.start import async_at_started
 
 from . import api, const
+from .cache import (
+    CachedForecast,
+    ForecastCache,
+    get_credentials_id,
+    get_forecast_cache,
+    get_token_store,
+)
+from .forecast import SrfForecastData
+from .geolocations import GeolocationIndex, get_geolocation_index
+from .scheduler import QuotaScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
-_MIN_DELAY = timedelta(minutes=15)
+_RETRY_DELAY = timedelta(minutes=15)
+_COMPACT_INTERVAL = timedelta(hours=1)
+# maximum number of forecasts of a credential that are fetched at the same time
+_FETCH_WINDOW = 4
+_EXECUTOR_PARSE_BYTES = 64 * 1024
+# with this many geolocations refreshing together, parsing on the loop adds up even for small responses
+_EXECUTOR_PARSE_GEOLOCATIONS = 5
+
+ParseMode = Literal["auto", "loop", "executor"]
+"""Where forecast responses are parsed, "auto" picks the loop or the executor by the response size and the number of geolocations."""
 
 
 @dataclasses.dataclass(slots=True)
@@ -22,30 +48,479 @@ class Coordinator:
     A single coordinator exists per customer key / secret. Use `get_coordinator` to get it.
 
     The coordinator exists to handle rate limits and fairly spread available slots across multiple weather entites.
+    The actual planning of API calls is done by the scheduler.
     """
 
+    hass: HomeAssistant
+    credentials_id: str
     client: api.Client
-    consumers: int
+    scheduler: QuotaScheduler
+    cache: ForecastCache
+    geolocations: GeolocationIndex
+    fetch_window: int = _FETCH_WINDOW
+    """Maximum number of forecasts fetched at the same time."""
+    parse_mode: ParseMode = "auto"
+    parse_in_executor_bytes: int = _EXECUTOR_PARSE_BYTES
+    """In "auto" mode, forecast responses at least this large are parsed in the executor so they don't block the event loop."""
+    fetch_limiter: asyncio.Semaphore = dataclasses.field(init=False)
+    _forecasts: dict[str, "ForecastCoordinator"] = dataclasses.field(
+        default_factory=dict
+    )
+    _status_listeners: list[Callable[[], None]] = dataclasses.field(
+        default_factory=list
+    )
+    _credential_sensors_entry_id: str | None = None
+    _unsub_status_timer: CALLBACK_TYPE | None = None
 
-    def request_next_api_call(self) -> datetime:
-        if self.consumers == 0:
-            _LOGGER.warn(
-                "untracked consumer is requesting an api call", stack_info=True
-            )
-            self.consumers = 1
+    def __post_init__(self) -> None:
+        self.fetch_limiter = asyncio.Semaphore(self.fetch_window)
+
+    def get_forecast_coordinator(self, geolocation_id: str) -> "ForecastCoordinator":
+        try:
+            return self._forecasts[geolocation_id]
+        except LookupError:
+            pass
+
+        forecast = self._forecasts[geolocation_id] = ForecastCoordinator(
+            self, geolocation_id
+        )
+        return forecast
+
+    async def async_get_geolocations(
+        self, lat: float, lon: float
+    ) -> list[api.Geolocation]:
+        """Geolocations near a position.
+
+        The geolocation index only answers positions the api has already been asked, other ones always go to the api.
+        """
+        geolocations = await self.geolocations.async_get_position(lat, lon)
+        if geolocations is not None:
+            _LOGGER.debug("found %s indexed geolocations", len(geolocations))
+            return geolocations
+
+        geolocations = await self.client.get_geolocations(str(lat), str(lon))
+        await self.geolocations.async_add(geolocations)
+        await self.geolocations.async_set_position_query(lat, lon, geolocations)
+        return geolocations
 
+    async def async_search_geolocations(
+        self, *, name: str | None = None, zip: int | None = None, limit: int = 30
+    ) -> list[api.Geolocation]:
+        """Geolocations with a name starting with `name` or with the ZIP code `zip`.
+
+        The geolocation index only answers searches the api has already been asked, other ones always go to the api.
+        """
+        index = self.geolocations
+        if name is not None:
+            geolocations = await index.async_search_name(name, limit=limit)
+        else:
+            assert zip is not None, "either name or zip must be given"
+            geolocations = await index.async_search_zip(zip, limit=limit)
+        if geolocations is not None:
+            _LOGGER.debug("found %s indexed geolocations", len(geolocations))
+            return geolocations
+
+        results = await self.client.search_geolocation(name=name, zip=zip, limit=limit)
+        await index.async_add_search_results(results)
+        # the indexed geolocations include the names of the results
+        geolocations = await index.async_get_many(
+            result["geolocation"]["id"] for result in results
+        )
+        if name is not None:
+            await index.async_set_name_query(name, geolocations, limit=limit)
+        else:
+            await index.async_set_zip_query(zip, geolocations, limit=limit)
+        return geolocations
+
+    async def async_refresh_due(self) -> None:
+        """Fetch the forecasts of all geolocations of the credential that are due.
+
+        Geolocations without any data go first, then the ones that have been due for the longest.
+        At most `fetch_window` of them are fetched at the same time, every result is passed to the listeners of its geolocation as soon as it arrives.
+        """
         now = datetime.now(tz=timezone.utc)
-        ratelimit = self.client.ratelimit
-        if not ratelimit:
-            return now + self.consumers * timedelta(hours=1)
+        due = [
+            forecast
+            for forecast in self._forecasts.values()
+            if forecast.has_listeners and forecast.should_update(now)
+        ]
+        if not due:
+            return
+        due.sort(
+            key=lambda forecast: (
+                forecast.data is not None,
+                forecast.next_update_at or datetime.min.replace(tzinfo=timezone.utc),
+            )
+        )
+        _LOGGER.debug(
+            "fetching %s due geolocations, %s at a time", len(due), self.fetch_window
+        )
+        # the fetches queue up for the limiter in this order
+        await asyncio.gather(*(forecast.async_scheduled_refresh() for forecast in due))
+
+    def get_parse_mode(self, size: int) -> ParseMode:
+        """Where to parse a forecast response of `size` bytes."""
+        if self.parse_mode != "auto":
+            return self.parse_mode
+        geolocations = sum(
+            forecast.has_listeners for forecast in self._forecasts.values()
+        )
+        if (
+            size >= self.parse_in_executor_bytes
+            or geolocations >= _EXECUTOR_PARSE_GEOLOCATIONS
+        ):
+            return "executor"
+        return "loop"
+
+    async def _async_at_started(self, hass: HomeAssistant) -> None:
+        # all entries are set up by now, fetch everything they're missing in one go instead of waiting for the scheduler to get to them
+        await self.async_refresh_due()
+
+    def async_add_status_listener(
+        self, listener: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Add a listener that is called whenever the status of the api or a geolocation may have changed.
+
+        That's after every fetch attempt, successful or not, whenever a geolocation gets new data and whenever an api call leaves the window of `calls_last_hour` or the circuit breaker closes again.
+        """
+        self._status_listeners.append(listener)
+        self._schedule_status_timer()
+
+        def remove_listener() -> None:
+            self._status_listeners.remove(listener)
+            if not self._status_listeners:
+                self._cancel_status_timer()
+
+        return remove_listener
+
+    @callback
+    def async_notify_status(self) -> None:
+        for listener in list(self._status_listeners):
+            listener()
+        self._schedule_status_timer()
+
+    def _schedule_status_timer(self) -> None:
+        self._cancel_status_timer()
+        if not self._status_listeners:
+            return
+        if change_at := self.client.next_status_change:
+            self._unsub_status_timer = async_track_point_in_utc_time(
+                self.hass, self._handle_status_timer, change_at
+            )
+
+    def _cancel_status_timer(self) -> None:
+        if self._unsub_status_timer:
+            self._unsub_status_timer()
+            self._unsub_status_timer = None
+
+    @callback
+    def _handle_status_timer(self, now: datetime) -> None:
+        self._unsub_status_timer = None
+        self.async_notify_status()
+
+    def claim_credential_sensors(self, entry_id: str) -> bool:
+        """Claim the sensors of the credential for a config entry.
+
+        All entries with the same credential share them, so only the first entry that claims them creates them.
+        """
+        if self._credential_sensors_entry_id not in (None, entry_id):
+            return False
+        self._credential_sensors_entry_id = entry_id
+        return True
+
+    def release_credential_sensors(self, entry_id: str) -> None:
+        if self._credential_sensors_entry_id == entry_id:
+            self._credential_sensors_entry_id = None
+
+
+ForecastListener = Callable[[SrfForecastData], None]
+
+
+class ForecastCoordinator:
+    """Forecast data for a single geolocation.
+
+    A single instance exists per geolocation and client coordinator. Use `Coordinator.get_forecast_coordinator` to get it.
+
+    All consumers of the same geolocation share the fetched data and concurrent refreshes are coalesced into a single API call.
+    Each geolocation counts as a single consumer of the scheduler, no matter how many listeners it has.
+    While there are listeners, the data is fetched automatically whenever the scheduler plans it.
+    Forecasts that have elapsed are pruned from the data periodically, only the last `keep_elapsed` of them are kept.
+    Data that was resampled to a different step than `resample_step` is served until it has been fetched again with the current step.
+    """
+
+    def __init__(self, coordinator: Coordinator, geolocation_id: str) -> None:
+        self.coordinator = coordinator
+        self.geolocation_id = geolocation_id
 
-        calls_per_consumer = ratelimit.available / self.consumers
-        if calls_per_consumer <= 0:
-            return ratelimit.reset_time
+        self.data: SrfForecastData | None = None
+        self.fetched_at: datetime | None = None
+        self.last_fetch_duration: float | None = None
+        """Seconds the last successful fetch took, including retries and parsing."""
+        self.keep_elapsed = timedelta(hours=const.DEFAULT_KEEP_ELAPSED_HOURS)
+        self.resample_step: timedelta | None = None
 
-        duration_to_reset = ratelimit.reset_time - now
-        delay = duration_to_reset / math.floor(calls_per_consumer)
-        return now + max(delay, _MIN_DELAY)
+        self._listeners: list[ForecastListener] = []
+        self._refresh_task: asyncio.Task[SrfForecastData] | None = None
+        self._retry_at: datetime | None = None
+        self._unsub_plan: CALLBACK_TYPE | None = None
+        self._unsub_fetch_timer: CALLBACK_TYPE | None = None
+        self._unsub_compact: CALLBACK_TYPE | None = None
+
+    @property
+    def next_update_at(self) -> datetime | None:
+        return self.coordinator.scheduler.get_next_fetch(self.geolocation_id)
+
+    @property
+    def has_listeners(self) -> bool:
+        return bool(self._listeners)
+
+    @property
+    def has_current_data(self) -> bool:
+        """Whether there's data and it was resampled with the current `resample_step`."""
+        return self.data is not None and self.data.resample_step == self.resample_step
+
+    def set_resample_step(self, step: timedelta | None) -> None:
+        """Change the step the hourly forecasts are resampled to.
+
+        The data can't be resampled again without the original intervals and the api only sends them again once they change.
+        So the data is fetched again right away, without a conditional request.
+        """
+        if step == self.resample_step:
+            return
+        self.resample_step = step
+        if self._listeners and not self.has_current_data:
+            # the geolocation is due immediately without a last fetch
+            self.coordinator.scheduler.add_consumer(self.geolocation_id)
+
+    def async_add_listener(self, listener: ForecastListener) -> Callable[[], None]:
+        scheduler = self.coordinator.scheduler
+        self._listeners.append(listener)
+        if len(self._listeners) == 1:
+            self._unsub_plan = scheduler.add_listener(self._schedule_fetch)
+            scheduler.add_consumer(
+                self.geolocation_id,
+                last_fetch_at=self.fetched_at if self.has_current_data else None,
+            )
+            self._unsub_compact = async_track_time_interval(
+                self.coordinator.hass, self._handle_compact, _COMPACT_INTERVAL
+            )
+
+        def remove_listener() -> None:
+            self._listeners.remove(listener)
+            if not self._listeners:
+                if self._unsub_plan:
+                    self._unsub_plan()
+                    self._unsub_plan = None
+                if self._unsub_compact:
+                    self._unsub_compact()
+                    self._unsub_compact = None
+                self._cancel_fetch_timer()
+                scheduler.remove_consumer(self.geolocation_id)
+
+        return remove_listener
+
+    def should_update(self, now: datetime) -> bool:
+        if self.coordinator.client.circuit_open_until:
+            # the api is unavailable, requests would fail immediately anyway
+            return False
+        next_update_at = self.next_update_at
+        if not self.has_current_data or next_update_at is None:
+            return True
+        return now >= next_update_at
+
+    @callback
+    def _cancel_fetch_timer(self) -> None:
+        if self._unsub_fetch_timer:
+            self._unsub_fetch_timer()
+            self._unsub_fetch_timer = None
+
+    @callback
+    def _schedule_fetch(self) -> None:
+        self._cancel_fetch_timer()
+        if not self._listeners:
+            return
+
+        fetch_at = self.next_update_at
+        if self._retry_at and (fetch_at is None or fetch_at < self._retry_at):
+            fetch_at = self._retry_at
+        if fetch_at is None:
+            return
+        self._unsub_fetch_timer = async_track_point_in_utc_time(
+            self.coordinator.hass, self._handle_fetch_timer, fetch_at
+        )
+
+    @callback
+    def _handle_fetch_timer(self, now: datetime) -> None:
+        self._unsub_fetch_timer = None
+        if not self.should_update(now):
+            self._schedule_fetch()
+            return
+        self.coordinator.hass.async_create_background_task(
+            self.async_scheduled_refresh(),
+            f"srf_weather refresh {self.geolocation_id}",
+        )
+
+    async def async_scheduled_refresh(self) -> None:
+        """Refresh the data, retrying later if that fails instead of raising."""
+        try:
+            await self.async_refresh()
+        except Exception as exc:
+            self._retry_at = datetime.now(tz=timezone.utc) + _RETRY_DELAY
+            _LOGGER.warning(
+                "failed to update forecast for geolocation %s, retrying at %s",
+                self.geolocation_id,
+                self._retry_at,
+                exc_info=exc,
+            )
+        self._schedule_fetch()
+
+    @callback
+    def _handle_compact(self, now: datetime) -> None:
+        if self.data is None:
+            return
+        data = self.data.prune(now, keep=self.keep_elapsed)
+        if data is self.data:
+            return
+        _LOGGER.debug("pruned elapsed forecasts of geolocation %s", self.geolocation_id)
+        self._set_data(data, fetched_at=self.fetched_at)
+
+    async def async_load(self) -> None:
+        """Serve the cached data for this geolocation, if there is any.
+
+        This should be called before adding the first listener, so the scheduler already knows how old the data is.
+        """
+        if self.data is not None:
+            return
+        cached = await self.coordinator.cache.async_get(self.geolocation_id)
+        if cached is None or self.data is not None:
+            return
+        _LOGGER.debug(
+            "loaded cached data for geolocation %s fetched at %s",
+            self.geolocation_id,
+            cached.fetched_at,
+        )
+        self._set_data(cached.data, fetched_at=cached.fetched_at)
+
+    def async_restore(self, data: SrfForecastData) -> None:
+        if self.data is not None:
+            # another consumer already provided (more recent) data
+            return
+        self._set_data(data, fetched_at=None)
+
+    async def async_refresh(self) -> SrfForecastData:
+        task = self._refresh_task
+        if task is None:
+            task = self._refresh_task = asyncio.create_task(self._fetch())
+        else:
+            _LOGGER.debug(
+                "joining in-flight request for geolocation %s", self.geolocation_id
+            )
+        # shield the shared task so a cancelled consumer doesn't cancel it for everyone else
+        return await asyncio.shield(task)
+
+    async def _fetch(self) -> SrfForecastData:
+        started = time.perf_counter()
+        try:
+            _LOGGER.info(
+                "updating forecast for geolocation %s from api", self.geolocation_id
+            )
+            client = self.coordinator.client
+            # data resampled with another step has to be replaced even if the forecast didn't change
+            if_changed = self.has_current_data
+            # cached data from before a restart can't be compared to, a changed response doesn't mean a new run
+            detects_changes = if_changed and client.can_detect_forecast_changes(
+                self.geolocation_id
+            )
+            async with self.coordinator.fetch_limiter:
+                body = await client.get_forecast_week_by_geo_location(
+                    self.geolocation_id,
+                    if_changed=if_changed,
+                    # parsed below, possibly in the executor
+                    decoder=_get_raw_body,
+                )
+            data = None
+            if body is not None:
+                try:
+                    data = await self._async_parse(body)
+                except Exception:
+                    # the validators already match this body, the next conditional request would skip it
+                    client.discard_forecast_validators(self.geolocation_id)
+                    raise
+            changed = data is not None if detects_changes else None
+            if data is None:
+                # unchanged since the last fetch, no need to parse it again
+                assert self.data  # only requested if_changed when we have data
+                data = self.data
+        except Exception:
+            self.coordinator.async_notify_status()
+            raise
+        finally:
+            self._refresh_task = None
+
+        self.last_fetch_duration = time.perf_counter() - started
+        self._retry_at = None
+        fetched_at = datetime.now(tz=timezone.utc)
+        self.coordinator.scheduler.record_fetch(
+            self.geolocation_id, fetched_at, changed=changed
+        )
+        data = self._set_data(data, fetched_at=fetched_at)
+        await self.coordinator.cache.async_set(
+            self.geolocation_id, CachedForecast(data=data, fetched_at=fetched_at)
+        )
+        return data
+
+    async def _async_parse(self, body: bytes) -> SrfForecastData:
+        parse = functools.partial(
+            _parse_forecast,
+            decoder=self.coordinator.client.json_decoder,
+            resample_step=self.resample_step,
+        )
+        hass = self.coordinator.hass
+        metrics = self.coordinator.client.metrics
+        mode = self.coordinator.get_parse_mode(len(body))
+        metrics.increment(f"forecast.parse.{mode}")
+        with metrics.time("forecast.parse_seconds", mode=mode):
+            if mode == "executor":
+                data, geolocation = await hass.async_add_executor_job(parse, body)
+            else:
+                # this blocks everything else in Home Assistant, see `forecast.loop_blocked_seconds`
+                with metrics.time("forecast.loop_blocked_seconds"):
+                    data, geolocation = parse(body)
+        await self.coordinator.geolocations.async_add([geolocation])
+        return data
+
+    def _set_data(
+        self, data: SrfForecastData, *, fetched_at: datetime | None
+    ) -> SrfForecastData:
+        # cached or restored data may be old, there's no point in keeping what has already elapsed
+        data = data.prune(datetime.now(tz=timezone.utc), keep=self.keep_elapsed)
+        self.data = data
+        self.fetched_at = fetched_at
+        _LOGGER.debug(
+            "data for geolocation %s updated, next update at %s",
+            self.geolocation_id,
+            self.next_update_at,
+        )
+        for listener in list(self._listeners):
+            listener(data)
+        self.coordinator.async_notify_status()
+        return data
+
+
+def _get_raw_body(body: bytes) -> bytes:
+    return body
+
+
+def _parse_forecast(
+    body: bytes, *, decoder: api.JsonDecoder, resample_step: timedelta | None
+) -> tuple[SrfForecastData, api.Geolocation]:
+    """Parse the body of a `forecastpoint` response, safe to run in the executor.
+
+    Returns the forecast data and the geolocation of the forecast.
+    """
+    forecast_week: api.ForecastPointWeek = decoder(body)
+    data = SrfForecastData.create_from_api(forecast_week, resample_step=resample_step)
+    return data, forecast_week["geolocation"]
 
 
 def get_coordinator(hass: HomeAssistant, config_data: Mapping[str, Any]) -> Coordinator:
@@ -63,8 +538,15 @@ def get_coordinator(hass: HomeAssistant, config_data: Mapping[str, Any]) -> Coor
         async_get_clientsession(hass),
         consumer_key=consumer_key,
         consumer_secret=consumer_secret,
+        token_store=get_token_store(hass, consumer_key, consumer_secret),
     )
     coordinator = hass.data.setdefault(const.DOMAIN, {})[key] = Coordinator(
-        client, consumers=0
+        hass,
+        get_credentials_id(consumer_key, consumer_secret),
+        client,
+        scheduler=QuotaScheduler(client),
+        cache=get_forecast_cache(hass),
+        geolocations=get_geolocation_index(hass),
     )
+    async_at_started(hass, coordinator._async_at_started)
     return coordinator
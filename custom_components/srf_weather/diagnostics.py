@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_CONSUMER_KEY, CONF_CONSUMER_SECRET, CONF_GEOLOCATION_ID
+from .coordinator import get_coordinator
+
+TO_REDACT = {
+    CONF_CONSUMER_KEY,
+    CONF_CONSUMER_SECRET,
+    # the geolocation id consists of the coordinates of the location
+    CONF_GEOLOCATION_ID,
+    "authorization_header",
+    "access_token",
+    "unique_id",
+    "title",
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    coordinator = get_coordinator(hass, entry.data)
+    client = coordinator.client
+    scheduler = coordinator.scheduler
+    geolocation_id = entry.data[CONF_GEOLOCATION_ID]
+    forecast = coordinator.get_forecast_coordinator(geolocation_id)
+    now = datetime.now(tz=timezone.utc)
+
+    ratelimit = client.ratelimit
+    run_period = scheduler.cadence.period
+    data = forecast.data
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "credentials": {
+            "ratelimit": {
+                "allowed": ratelimit.allowed,
+                "available": ratelimit.available,
+                "reset_time": ratelimit.reset_time,
+            }
+            if ratelimit
+            else None,
+            "circuit_open_until": client.circuit_open_until,
+            "metrics": client.metrics.as_dict(),
+        },
+        "scheduler": {
+            "consumers": scheduler.consumers,
+            "interval": str(scheduler.get_interval(now)),
+            "run_period": str(run_period) if run_period else None,
+            # other entries' geolocations aren't included, only where this one is in line
+            "plan": [
+                {"next_fetch_at": planned, "this_entry": planned_id == geolocation_id}
+                for planned_id, planned in scheduler.plan.items()
+            ],
+        },
+        "forecast": {
+            "fetched_at": forecast.fetched_at,
+            "next_update_at": forecast.next_update_at,
+            "should_update": forecast.should_update(now),
+            "data": {
+                "hourly": len(data.hourly),
+                "daily": len(data.daily),
+                "slot_end": data.get_slot_end(now),
+            }
+            if data
+            else None,
+        },
+    }
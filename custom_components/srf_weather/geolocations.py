@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import unicodedata
+from collections.abc import Iterable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from . import api, const
+
+_LOGGER = logging.getLogger(__name__)
+
+_STORAGE_VERSION = 1
+_STORAGE_KEY = f"{const.DOMAIN}.geolocations"
+_SAVE_DELAY = 30  # seconds
+
+# types of search results that are identified by their ZIP code
+_ZIP_CODE_TYPES = frozenset(("city", "zip"))
+
+
+def _normalize_name(name: str) -> str:
+    """Case and accent insensitive form of a name, "Zürich" and "zurich" are the same."""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _name_from_search_result(
+    result: api.GeolocationNamesSearch,
+) -> api.GeolocationName:
+    name: api.GeolocationName = {
+        "id": str(result["id"]),
+        "location_id": str(result["location_id"]),
+        "type": result["type"],
+        "translation_type": result["translation_type"],
+        "language": result["language"],
+        "name": result["name"],
+        "description_short": result["name"],
+        "description_long": result["name"],
+    }
+    # only these have the ZIP code as their location id, for POIs etc. it's some other id
+    if result["type"] in _ZIP_CODE_TYPES:
+        name["plz"] = result["location_id"]
+    return name
+
+
+class GeolocationIndex:
+    """On-disk index of every geolocation the integration has seen.
+
+    A single index exists per Home Assistant instance. Use `get_geolocation_index` to get it.
+
+    Lookups by position and searches by name or ZIP code are only answered offline if the api has been asked exactly the same before.
+    Knowing some of the geolocations near a position or matching a search doesn't mean the index knows all of them.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._store: Store[dict[str, Any]] = Store(hass, _STORAGE_VERSION, _STORAGE_KEY)
+        self._geolocations: dict[str, api.Geolocation] | None = None
+        # geolocation ids of answered api queries, so the same query is only sent once
+        self._queries: dict[str, list[str]] = {}
+        self._load_lock = asyncio.Lock()
+
+    async def _async_load(self) -> dict[str, api.Geolocation]:
+        async with self._load_lock:
+            if self._geolocations is None:
+                stored = await self._store.async_load() or {}
+                self._geolocations = {}
+                for geolocation in stored.get("geolocations", []):
+                    self._add(geolocation)
+                self._queries = stored.get("queries", {})
+                _LOGGER.debug("loaded %s indexed geolocations", len(self._geolocations))
+        return self._geolocations
+
+    async def async_add(self, geolocations: Iterable[api.Geolocation]) -> None:
+        await self._async_load()
+        changed = False
+        for geolocation in geolocations:
+            changed = self._add(geolocation) or changed
+        if changed:
+            self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    async def async_add_search_results(
+        self, results: Iterable[api.GeolocationNamesSearch]
+    ) -> None:
+        await self.async_add(
+            {
+                **result["geolocation"],
+                "geolocation_names": [_name_from_search_result(result)],
+            }
+            for result in results
+        )
+
+    async def async_get_position(
+        self, lat: float, lon: float
+    ) -> list[api.Geolocation] | None:
+        """Geolocations the api returned for the same position, `None` if it hasn't been asked yet."""
+        return await self._async_get_query(self._get_position_query(lat, lon))
+
+    async def async_search_name(
+        self, name: str, *, limit: int
+    ) -> list[api.Geolocation] | None:
+        """Geolocations the api returned for the same name search, `None` if it hasn't been asked yet."""
+        return await self._async_get_query(self._get_name_query(name, limit))
+
+    async def async_search_zip(
+        self, zip_code: int, *, limit: int
+    ) -> list[api.Geolocation] | None:
+        """Geolocations the api returned for the same ZIP code search, `None` if it hasn't been asked yet."""
+        return await self._async_get_query(self._get_zip_query(zip_code, limit))
+
+    async def async_get_many(self, ids: Iterable[str]) -> list[api.Geolocation]:
+        """Indexed geolocations by id, each one only once."""
+        await self._async_load()
+        return self._get_many(dict.fromkeys(ids))
+
+    async def async_set_position_query(
+        self, lat: float, lon: float, geolocations: Iterable[api.Geolocation]
+    ) -> None:
+        """Remember the geolocations the api returned for a position."""
+        await self._async_set_query(self._get_position_query(lat, lon), geolocations)
+
+    async def async_set_name_query(
+        self, name: str, geolocations: Iterable[api.Geolocation], *, limit: int
+    ) -> None:
+        """Remember the geolocations the api returned for a name search."""
+        await self._async_set_query(self._get_name_query(name, limit), geolocations)
+
+    async def async_set_zip_query(
+        self, zip_code: int, geolocations: Iterable[api.Geolocation], *, limit: int
+    ) -> None:
+        """Remember the geolocations the api returned for a ZIP code search."""
+        await self._async_set_query(self._get_zip_query(zip_code, limit), geolocations)
+
+    async def _async_get_query(self, query: str) -> list[api.Geolocation] | None:
+        await self._async_load()
+        if (queried := self._queries.get(query)) is None:
+            return None
+        return self._get_many(queried)
+
+    async def _async_set_query(
+        self, query: str, geolocations: Iterable[api.Geolocation]
+    ) -> None:
+        await self._async_load()
+        if ids := [geolocation["id"] for geolocation in geolocations]:
+            self._queries[query] = ids
+            self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    def _get_position_query(self, lat: float, lon: float) -> str:
+        # about 100 m
+        return f"position:{lat:.3f},{lon:.3f}"
+
+    def _get_name_query(self, name: str, limit: int) -> str:
+        # the api doesn't care about case or accents either
+        return f"name:{limit}:{_normalize_name(name)}"
+
+    def _get_zip_query(self, zip_code: int, limit: int) -> str:
+        return f"zip:{limit}:{zip_code}"
+
+    def _get_many(self, ids: Iterable[str]) -> list[api.Geolocation]:
+        assert self._geolocations is not None
+        return [
+            self._geolocations[geolocation_id]
+            for geolocation_id in ids
+            if geolocation_id in self._geolocations
+        ]
+
+    def _add(self, geolocation: api.Geolocation) -> bool:
+        """Add a geolocation or the names it has that aren't known yet.
+
+        Returns whether the index changed.
+        """
+        assert self._geolocations is not None
+        geolocation_id = geolocation["id"]
+        changed = False
+        indexed = self._geolocations.get(geolocation_id)
+        if indexed is None:
+            indexed = self._geolocations[geolocation_id] = {
+                **geolocation,
+                "geolocation_names": [],
+            }
+            changed = True
+
+        known_names = {name["id"] for name in indexed["geolocation_names"]}
+        for geolocation_name in geolocation.get("geolocation_names", ()):
+            if geolocation_name["id"] in known_names:
+                continue
+            indexed["geolocation_names"].append(geolocation_name)
+            known_names.add(geolocation_name["id"])
+            changed = True
+        return changed
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "geolocations": list((self._geolocations or {}).values()),
+            "queries": self._queries,
+        }
+
+
+_DATA_GEOLOCATION_INDEX = "geolocation_index"
+
+
+def get_geolocation_index(hass: HomeAssistant) -> GeolocationIndex:
+    domain_data = hass.data.setdefault(const.DOMAIN, {})
+    try:
+        return domain_data[_DATA_GEOLOCATION_INDEX]
+    except LookupError:
+        pass
+
+    index = domain_data[_DATA_GEOLOCATION_INDEX] = GeolocationIndex(hass)
+    return index
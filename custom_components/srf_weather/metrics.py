@@ -0,0 +1,103 @@
+import bisect
+import contextlib
+import dataclasses
+import json
+import logging
+import time
+from collections.abc import Iterator
+from typing import Any
+
+# enable debug logging for this logger to get every recorded value as a json log line
+_LOGGER = logging.getLogger(__name__)
+
+# upper bounds of the histogram buckets, the last bucket catches everything above
+_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000)
+
+
+@dataclasses.dataclass(slots=True)
+class Histogram:
+    bounds: tuple[float, ...]
+    buckets: list[int] = dataclasses.field(init=False)
+    count: int = 0
+    total: float = 0.0
+    min: float | None = None
+    max: float | None = None
+    last: float | None = None
+
+    def __post_init__(self) -> None:
+        self.buckets = [0] * (len(self.bounds) + 1)
+
+    def record(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.last = value
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+            "buckets": {
+                f"<={bound:g}": count
+                for bound, count in zip(self.bounds, self.buckets, strict=False)
+            }
+            | {f">{self.bounds[-1]:g}": self.buckets[-1]},
+        }
+
+
+class Metrics:
+    """Counters and histograms of a single client (credential).
+
+    Durations are recorded in seconds and sizes in bytes, histogram names end in `_seconds` and `_bytes` respectively.
+    """
+
+    def __init__(self) -> None:
+        self._counters: dict[str, int] = {}
+        self._histograms: dict[str, Histogram] = {}
+
+    def increment(self, name: str, value: int = 1, **labels: Any) -> None:
+        self._counters[name] = self._counters.get(name, 0) + value
+        self._log("counter", name, value, labels)
+
+    def record(self, name: str, value: float, **labels: Any) -> None:
+        try:
+            histogram = self._histograms[name]
+        except LookupError:
+            bounds = _SIZE_BUCKETS if name.endswith("_bytes") else _DURATION_BUCKETS
+            histogram = self._histograms[name] = Histogram(bounds)
+        histogram.record(value)
+        self._log("histogram", name, value, labels)
+
+    @contextlib.contextmanager
+    def time(self, name: str, **labels: Any) -> Iterator[None]:
+        """Record the duration of the block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **labels)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "counters": dict(sorted(self._counters.items())),
+            "histograms": {
+                name: histogram.as_dict()
+                for name, histogram in sorted(self._histograms.items())
+            },
+        }
+
+    def _log(self, kind: str, name: str, value: float, labels: dict[str, Any]) -> None:
+        if not _LOGGER.isEnabledFor(logging.DEBUG):
+            return
+        _LOGGER.debug(
+            "%s",
+            json.dumps(
+                {"type": kind, "name": name, "value": value, **labels}, default=str
+            ),
+        )
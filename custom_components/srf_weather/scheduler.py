@@ -0,0 +1,308 @@
+import collections
+import itertools
+import logging
+import math
+import statistics
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+from . import api
+
+_LOGGER = logging.getLogger(__name__)
+
+_MIN_INTERVAL = timedelta(minutes=15)
+_UNKNOWN_RATELIMIT_INTERVAL = timedelta(hours=1)
+
+# runs needed to learn the period
+_MIN_RUNS = 4
+# runs remembered to fit the period
+_MAX_RUNS = 16
+_RUN_GRACE = timedelta(minutes=5)
+_ADAPTIVE_SPACING = timedelta(minutes=1)
+
+
+class RunCadence:
+    """Learns when SRF publishes new forecast runs.
+
+    A fetch that returns a changed payload means a run was published after the previous fetch of the same geolocation and at or before this one.
+    The fetches of different geolocations are staggered, so the overlapping windows of the geolocations that saw the same run narrow down when it was published.
+    Once the cadence is known, a run is placed where it was expected, or at the edge of its window closest to that if the window rules it out.
+    The time a fetch happened to be planned at therefore never shifts the cadence by itself, only fetches that saw a run earlier or later than expected do.
+    The period is fitted to the runs by least squares, so runs that weren't observed in between don't matter.
+    """
+
+    def __init__(self) -> None:
+        # estimated publication time of the latest runs
+        self._runs: collections.deque[datetime] = collections.deque(maxlen=_MAX_RUNS)
+        self._period: timedelta | None = None
+        # the latest run was published after the first and at or before the second time
+        self._window: tuple[datetime, datetime] | None = None
+        # time the latest run was expected at, `None` if the cadence wasn't known yet
+        self._expected: datetime | None = None
+
+    @property
+    def period(self) -> timedelta | None:
+        """Learned time between two runs, `None` until enough runs have been observed."""
+        return self._period
+
+    def record_run(self, observed_at: datetime, *, not_before: datetime) -> None:
+        """Record a run that was published after `not_before` and at or before `observed_at`."""
+        lower, upper = not_before, observed_at
+        if self._window and max(lower, self._window[0]) < min(upper, self._window[1]):
+            # another geolocation already saw this run
+            lower, upper = max(lower, self._window[0]), min(upper, self._window[1])
+            self._runs.pop()
+        else:
+            self._expected = self._get_expected_run(lower, upper)
+        self._window = (lower, upper)
+        if (expected := self._expected) is None:
+            # the middle of the window is the best guess without a cadence
+            self._runs.append(lower + (upper - lower) / 2)
+        else:
+            self._runs.append(min(max(expected, lower), upper))
+        self._fit_period()
+        _LOGGER.debug(
+            "observed forecast run published between %s and %s, estimated at %s, period: %s",
+            lower,
+            upper,
+            self._runs[-1],
+            self._period,
+        )
+
+    def _get_expected_run(self, lower: datetime, upper: datetime) -> datetime | None:
+        """Expected run after the latest one that is closest to the window."""
+        if not (period := self.period) or not (last_run := self.get_previous_run()):
+            return None
+        runs = max(math.floor((upper - last_run) / period), 1)
+        return min(
+            (last_run + runs * period, last_run + (runs + 1) * period),
+            key=lambda run: max(lower - run, run - upper),
+        )
+
+    def _fit_period(self) -> None:
+        runs = self._runs
+        if (period := self._period) is None:
+            if len(runs) >= _MIN_RUNS:
+                self._period = statistics.median(
+                    b - a for a, b in itertools.pairwise(runs)
+                )
+            return
+        first = runs[0]
+        # number of periods since the first remembered run, some runs may not have been seen
+        counts = [round((run - first) / period) for run in runs]
+        if len(set(counts)) < 2:
+            return
+        slope, _ = statistics.linear_regression(
+            counts, [(run - first).total_seconds() for run in runs]
+        )
+        self._period = timedelta(seconds=slope)
+
+    def get_previous_run(self, ts: datetime | None = None) -> datetime | None:
+        """Latest run expected at or before `ts`, the latest observed run if `ts` is `None`."""
+        if not self._runs:
+            return None
+        last_run = self._runs[-1]
+        if ts is None:
+            return last_run
+        if not (period := self.period):
+            return None
+        return last_run + math.floor((ts - last_run) / period) * period
+
+    def get_next_fetch(
+        self,
+        last_fetch_at: datetime,
+        last_change_at: datetime | None,
+        *,
+        probe: bool = False,
+    ) -> datetime | None:
+        """Time to fetch a geolocation so it picks up the next run.
+
+        A probe is fetched shortly before the run is expected, so a run published earlier than expected is noticed.
+        """
+        if not (period := self.period) or not (
+            previous_run := self.get_previous_run(last_fetch_at)
+        ):
+            return None
+        if (last_change_at is None or last_change_at < previous_run) and (
+            last_fetch_at - previous_run < period / 4
+        ):
+            # the last fetch came after the expected run but didn't see it, the run is probably late
+            return last_fetch_at + _MIN_INTERVAL
+        next_run = previous_run + period
+        if probe and last_fetch_at < next_run - _RUN_GRACE:
+            return next_run - _RUN_GRACE
+        return next_run + _RUN_GRACE
+
+
+class QuotaScheduler:
+    """Plans the API calls of all geolocations sharing a credential.
+
+    The remaining quota is spread evenly over the time until the rate limit resets.
+    Fetches of different geolocations are staggered across that interval so they don't bunch up after a restart or a reset.
+
+    Once the publication cadence of the forecast runs has been learned, geolocations are fetched shortly after each expected run instead, as long as the quota allows fetching every run.
+    If there's quota to spare, one of them is also fetched shortly before, so the cadence follows runs that are published earlier than expected.
+    Between runs the payload doesn't change, so there's no point in fetching.
+
+    The plan is rebuilt whenever a consumer is added or removed and after every fetch.
+    """
+
+    def __init__(self, client: api.Client) -> None:
+        self._client = client
+        self._cadence = RunCadence()
+        self._last_fetch_at: dict[str, datetime | None] = {}
+        self._last_change_at: dict[str, datetime | None] = {}
+        self._plan: dict[str, datetime] = {}
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def consumers(self) -> int:
+        return len(self._last_fetch_at)
+
+    @property
+    def cadence(self) -> RunCadence:
+        return self._cadence
+
+    @property
+    def plan(self) -> dict[str, datetime]:
+        """Planned fetch time of every geolocation, in chronological order."""
+        return dict(sorted(self._plan.items(), key=lambda item: item[1]))
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Add a listener that is called whenever the plan changes."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def add_consumer(
+        self, geolocation_id: str, *, last_fetch_at: datetime | None = None
+    ) -> None:
+        self._last_fetch_at[geolocation_id] = last_fetch_at
+        self._last_change_at[geolocation_id] = last_fetch_at
+        self._replan()
+
+    def remove_consumer(self, geolocation_id: str) -> None:
+        self._last_fetch_at.pop(geolocation_id, None)
+        self._last_change_at.pop(geolocation_id, None)
+        self._replan()
+
+    def record_fetch(
+        self, geolocation_id: str, fetched_at: datetime, *, changed: bool | None = None
+    ) -> None:
+        """Record a fetch.
+
+        `changed` tells whether the payload changed since the previous fetch, `None` if that's unknown.
+        """
+        if geolocation_id not in self._last_fetch_at:
+            _LOGGER.warning(
+                "untracked geolocation %s fetched data", geolocation_id, stack_info=True
+            )
+        previous_fetch_at = self._last_fetch_at.get(geolocation_id)
+        self._last_fetch_at[geolocation_id] = fetched_at
+        metrics = self._client.metrics
+        metrics.increment("scheduler.fetches")
+        if changed is not None:
+            metrics.increment(
+                "scheduler.fetches_changed"
+                if changed
+                else "scheduler.fetches_unchanged"
+            )
+        if changed is not False:
+            self._last_change_at[geolocation_id] = fetched_at
+        if changed and previous_fetch_at:
+            self._cadence.record_run(fetched_at, not_before=previous_fetch_at)
+        self._replan()
+
+    def get_next_fetch(self, geolocation_id: str) -> datetime | None:
+        try:
+            planned = self._plan[geolocation_id]
+        except LookupError:
+            return None
+        if circuit_open_until := self._client.circuit_open_until:
+            # no point in fetching while the api is unavailable
+            return max(planned, circuit_open_until)
+        return planned
+
+    def get_interval(self, now: datetime) -> timedelta:
+        """Interval between two fetches of the same geolocation with the current quota."""
+        consumers = max(self.consumers, 1)
+        ratelimit = self._client.ratelimit
+        if not ratelimit:
+            return consumers * _UNKNOWN_RATELIMIT_INTERVAL
+
+        calls_per_consumer = math.floor(ratelimit.available / consumers)
+        if calls_per_consumer <= 0:
+            return max(ratelimit.reset_time - now, _MIN_INTERVAL)
+
+        return max((ratelimit.reset_time - now) / calls_per_consumer, _MIN_INTERVAL)
+
+    def _replan(self) -> None:
+        started = time.perf_counter()
+        self._plan.clear()
+        if not self._last_fetch_at:
+            return
+
+        now = datetime.now(tz=timezone.utc)
+        interval = self.get_interval(now)
+        earliest = now
+        ratelimit = self._client.ratelimit
+        if ratelimit and ratelimit.available <= 0:
+            earliest = max(earliest, ratelimit.reset_time)
+
+        # fetching every run is only possible if the quota allows it
+        period = self._cadence.period
+        adaptive = period is not None and period >= interval
+        # one geolocation is also fetched just before every expected run, if the quota allows the extra fetch
+        probe_id = (
+            next(iter(self._last_fetch_at))
+            if adaptive and period >= 2 * interval
+            else None
+        )
+
+        targets: dict[str, datetime] = {}
+        for geolocation_id, last_fetch_at in self._last_fetch_at.items():
+            target = earliest
+            if last_fetch_at:
+                target = max(target, last_fetch_at + interval)
+            if adaptive and last_fetch_at:
+                next_fetch = self._cadence.get_next_fetch(
+                    last_fetch_at,
+                    self._last_change_at.get(geolocation_id),
+                    probe=geolocation_id == probe_id,
+                )
+                if next_fetch:
+                    target = max(earliest, next_fetch)
+            targets[geolocation_id] = target
+
+        # consecutive fetches are at least this far apart
+        step = interval / len(targets)
+        if adaptive:
+            # fetch all geolocations soon after the run, don't spread them over the whole period
+            step = min(step, _ADAPTIVE_SPACING)
+        previous: datetime | None = None
+        # the geolocation that is due first gets the first slot, never fetched ones first of all
+        for geolocation_id, target in sorted(
+            targets.items(),
+            key=lambda item: (
+                item[1],
+                self._last_fetch_at[item[0]]
+                or datetime.min.replace(tzinfo=timezone.utc),
+            ),
+        ):
+            planned = target
+            if previous:
+                planned = max(planned, previous + step)
+            self._plan[geolocation_id] = previous = planned
+
+        _LOGGER.debug(
+            "planned %s geolocations with an interval of %s (run period: %s): %s",
+            len(targets),
+            interval,
+            period,
+            self._plan,
+        )
+        self._client.metrics.record(
+            "scheduler.replan_seconds", time.perf_counter() - started
+        )
+        for listener in list(self._listeners):
+            listener()
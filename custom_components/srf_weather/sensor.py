@@ -0,0 +1,440 @@
+import abc
+import dataclasses
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfIrradiance,
+    UnitOfLength,
+    UnitOfPrecipitationDepth,
+    UnitOfTemperature,
+    UnitOfTime,
+)
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.typing import StateType
+
+from .const import CONF_GEOLOCATION_ID
+from .coordinator import Coordinator, ForecastCoordinator, get_coordinator
+from .forecast import ForecastSrf, SrfForecastData
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class CredentialSensorEntityDescription(SensorEntityDescription):
+    value_fn: Callable[[Coordinator], StateType | datetime]
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class GeolocationSensorEntityDescription(SensorEntityDescription):
+    value_fn: Callable[[ForecastCoordinator], StateType | datetime]
+
+
+CREDENTIAL_SENSORS = (
+    CredentialSensorEntityDescription(
+        key="quota_available",
+        name="Quota available",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: (
+            ratelimit.available if (ratelimit := coordinator.client.ratelimit) else None
+        ),
+    ),
+    CredentialSensorEntityDescription(
+        key="quota_allowed",
+        name="Quota allowed",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: (
+            ratelimit.allowed if (ratelimit := coordinator.client.ratelimit) else None
+        ),
+    ),
+    CredentialSensorEntityDescription(
+        key="quota_reset",
+        name="Quota reset",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: (
+            ratelimit.reset_time
+            if (ratelimit := coordinator.client.ratelimit)
+            else None
+        ),
+    ),
+    CredentialSensorEntityDescription(
+        key="calls_last_hour",
+        name="API calls last hour",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.client.calls_last_hour,
+    ),
+    CredentialSensorEntityDescription(
+        key="api_unavailable_until",
+        name="API unavailable until",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.client.circuit_open_until,
+    ),
+)
+
+GEOLOCATION_SENSORS = (
+    GeolocationSensorEntityDescription(
+        key="last_fetch_duration",
+        name="Last fetch duration",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_display_precision=2,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda forecast: forecast.last_fetch_duration,
+    ),
+    GeolocationSensorEntityDescription(
+        key="last_success",
+        name="Last successful fetch",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda forecast: forecast.fetched_at,
+    ),
+)
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class ForecastSensorEntityDescription(SensorEntityDescription):
+    field: str | None = None
+    """Forecast field of the sensor, defaults to the key."""
+    daily: bool = False
+    """Use the forecast of the current day instead of the current hour."""
+
+
+FORECAST_SENSORS = (
+    ForecastSensorEntityDescription(
+        key="irradiance",
+        name="Irradiance",
+        device_class=SensorDeviceClass.IRRADIANCE,
+        native_unit_of_measurement=UnitOfIrradiance.WATTS_PER_SQUARE_METER,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    ForecastSensorEntityDescription(
+        key="fresh_snow_cm",
+        name="Fresh snow",
+        native_unit_of_measurement=UnitOfLength.CENTIMETERS,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:snowflake",
+    ),
+    ForecastSensorEntityDescription(
+        key="sunshine_minutes",
+        name="Sunshine",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MINUTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:weather-sunny",
+    ),
+    ForecastSensorEntityDescription(
+        key="symbol_code",
+        name="Symbol code",
+        icon="mdi:weather-partly-cloudy",
+    ),
+    ForecastSensorEntityDescription(
+        key="uv_index",
+        name="UV index",
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:sun-wireless",
+    ),
+    ForecastSensorEntityDescription(
+        key="precipitation_probability",
+        name="Precipitation probability",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:weather-rainy",
+    ),
+    ForecastSensorEntityDescription(
+        key="native_precipitation",
+        name="Precipitation",
+        device_class=SensorDeviceClass.PRECIPITATION,
+        native_unit_of_measurement=UnitOfPrecipitationDepth.MILLIMETERS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+    ),
+    ForecastSensorEntityDescription(
+        key="sunshine_hours",
+        name="Sunshine today",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        icon="mdi:weather-sunny",
+        daily=True,
+    ),
+    ForecastSensorEntityDescription(
+        key="native_temperature",
+        name="Temperature high today",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        entity_registry_enabled_default=False,
+        daily=True,
+    ),
+    ForecastSensorEntityDescription(
+        key="native_templow",
+        name="Temperature low today",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        entity_registry_enabled_default=False,
+        daily=True,
+    ),
+    ForecastSensorEntityDescription(
+        key="precipitation_probability_today",
+        name="Precipitation probability today",
+        field="precipitation_probability",
+        native_unit_of_measurement=PERCENTAGE,
+        icon="mdi:weather-rainy",
+        entity_registry_enabled_default=False,
+        daily=True,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    geolocation_id = config_entry.data[CONF_GEOLOCATION_ID]
+    coordinator = get_coordinator(hass, config_entry.data)
+    forecast = coordinator.get_forecast_coordinator(geolocation_id)
+    # the sensors listen as soon as they're added, the scheduler has to know how old the cached data is by then
+    await forecast.async_load()
+
+    entities: list[SensorEntity] = [
+        GeolocationSensor(
+            coordinator,
+            forecast,
+            description,
+            unique_id=f"{geolocation_id}-{description.key}",
+            name=f"{config_entry.title} {description.name}",
+        )
+        for description in GEOLOCATION_SENSORS
+    ]
+    # all forecast sensors of an entry share a single tracker, and with it the timer
+    tracker = CurrentForecastTracker(forecast)
+    entities.extend(
+        ForecastSensor(
+            tracker,
+            description,
+            unique_id=f"{geolocation_id}-{description.key}",
+            name=f"{config_entry.title} {description.name}",
+        )
+        for description in FORECAST_SENSORS
+    )
+    # the quota is shared by all entries with the same credential
+    if coordinator.claim_credential_sensors(config_entry.entry_id):
+        config_entry.async_on_unload(
+            lambda: coordinator.release_credential_sensors(config_entry.entry_id)
+        )
+        entities.extend(
+            CredentialSensor(
+                coordinator,
+                description,
+                unique_id=f"{coordinator.credentials_id}-{description.key}",
+                name=f"SRF Weather {description.name}",
+            )
+            for description in CREDENTIAL_SENSORS
+        )
+
+    async_add_entities(entities)
+
+
+class StatusSensor(SensorEntity):
+    """Sensor derived from the state of a coordinator.
+
+    The state is only written when the value changes after a fetch attempt or when a value expires by itself, the sensor never calls the api itself.
+    """
+
+    _attr_should_poll = False
+
+    def __init__(self, coordinator: Coordinator, *, unique_id: str, name: str) -> None:
+        self.coordinator = coordinator
+        self._attr_unique_id = unique_id
+        self._attr_name = name
+        self._attr_native_value = self._get_value()
+
+    @abc.abstractmethod
+    def _get_value(self) -> StateType | datetime: ...
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_status_listener(self._handle_status)
+        )
+        self._handle_status()
+
+    @callback
+    def _handle_status(self) -> None:
+        value = self._get_value()
+        if value == self._attr_native_value:
+            return
+        self._attr_native_value = value
+        self.async_write_ha_state()
+
+
+class CredentialSensor(StatusSensor):
+    entity_description: CredentialSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: Coordinator,
+        description: CredentialSensorEntityDescription,
+        **kwargs: Any,
+    ) -> None:
+        self.entity_description = description
+        super().__init__(coordinator, **kwargs)
+
+    def _get_value(self) -> StateType | datetime:
+        return self.entity_description.value_fn(self.coordinator)
+
+
+class GeolocationSensor(StatusSensor):
+    entity_description: GeolocationSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: Coordinator,
+        forecast: ForecastCoordinator,
+        description: GeolocationSensorEntityDescription,
+        **kwargs: Any,
+    ) -> None:
+        self.forecast = forecast
+        self.entity_description = description
+        super().__init__(coordinator, **kwargs)
+
+    def _get_value(self) -> StateType | datetime:
+        return self.entity_description.value_fn(self.forecast)
+
+
+ForecastNowListener = Callable[[], None]
+
+
+class CurrentForecastTracker:
+    """Current hourly and daily forecast of a geolocation.
+
+    The forecasts are only updated when new data arrives or the current slot ends.
+    """
+
+    def __init__(self, forecast: ForecastCoordinator) -> None:
+        self.forecast = forecast
+        self.hourly: ForecastSrf | None = None
+        self.daily: ForecastSrf | None = None
+
+        self._listeners: list[ForecastNowListener] = []
+        self._unsub_forecast: CALLBACK_TYPE | None = None
+        self._unsub_slot_timer: CALLBACK_TYPE | None = None
+
+    @property
+    def available(self) -> bool:
+        return self.forecast.data is not None
+
+    def async_add_listener(self, listener: ForecastNowListener) -> CALLBACK_TYPE:
+        self._listeners.append(listener)
+        if len(self._listeners) == 1:
+            self._unsub_forecast = self.forecast.async_add_listener(self._handle_data)
+            self._update()
+
+        def remove_listener() -> None:
+            self._listeners.remove(listener)
+            if self._listeners:
+                return
+            if self._unsub_forecast:
+                self._unsub_forecast()
+                self._unsub_forecast = None
+            self._cancel_slot_timer()
+
+        return remove_listener
+
+    def _cancel_slot_timer(self) -> None:
+        if self._unsub_slot_timer:
+            self._unsub_slot_timer()
+            self._unsub_slot_timer = None
+
+    @callback
+    def _handle_data(self, data: SrfForecastData) -> None:
+        self._update()
+        self._notify()
+
+    @callback
+    def _handle_slot_end(self, now: datetime) -> None:
+        self._unsub_slot_timer = None
+        self._update()
+        self._notify()
+
+    def _update(self) -> None:
+        self._cancel_slot_timer()
+        data = self.forecast.data
+        if not data:
+            self.hourly = self.daily = None
+            return
+
+        now = datetime.now(tz=timezone.utc)
+        self.hourly = data.get_forecast(now)
+        self.daily = data.get_daily_forecast(now)
+        if slot_end := data.get_slot_end(now):
+            self._unsub_slot_timer = async_track_point_in_utc_time(
+                self.forecast.coordinator.hass, self._handle_slot_end, slot_end
+            )
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
+
+
+class ForecastSensor(SensorEntity):
+    """A field of the current forecast.
+
+    The state is only written when the value of the field changes.
+    """
+
+    _attr_should_poll = False
+
+    entity_description: ForecastSensorEntityDescription
+
+    def __init__(
+        self,
+        tracker: CurrentForecastTracker,
+        description: ForecastSensorEntityDescription,
+        *,
+        unique_id: str,
+        name: str,
+    ) -> None:
+        self.tracker = tracker
+        self.entity_description = description
+        self._field = description.field or description.key
+        self._attr_unique_id = unique_id
+        self._attr_name = name
+
+    def _get_value(self) -> StateType:
+        tracker = self.tracker
+        forecast = tracker.daily if self.entity_description.daily else tracker.hourly
+        if not forecast:
+            return None
+        return forecast.get(self._field)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(self.tracker.async_add_listener(self._handle_forecast))
+        self._attr_available = self.tracker.available
+        self._attr_native_value = self._get_value()
+
+    @callback
+    def _handle_forecast(self) -> None:
+        available = self.tracker.available
+        value = self._get_value()
+        if value == self._attr_native_value and available == self._attr_available:
+            return
+        self._attr_available = available
+        self._attr_native_value = value
+        self.async_write_ha_state()
@@ -1,25 +1,8 @@
-import dataclasses
 import logging
-from collections.abc import Iterable, Iterator
-from datetime import date, datetime, timedelta, timezone
-from typing import Any, TypedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Literal
 
 from homeassistant.components.weather import (
-    ATTR_CONDITION_CLEAR_NIGHT,
-    ATTR_CONDITION_CLOUDY,
-    ATTR_CONDITION_EXCEPTIONAL,
-    ATTR_CONDITION_FOG,
-    ATTR_CONDITION_HAIL,
-    ATTR_CONDITION_LIGHTNING,
-    ATTR_CONDITION_LIGHTNING_RAINY,
-    ATTR_CONDITION_PARTLYCLOUDY,
-    ATTR_CONDITION_POURING,
-    ATTR_CONDITION_RAINY,
-    ATTR_CONDITION_SNOWY,
-    ATTR_CONDITION_SNOWY_RAINY,
-    ATTR_CONDITION_SUNNY,
-    ATTR_CONDITION_WINDY,
-    ATTR_CONDITION_WINDY_VARIANT,
     Forecast,
     WeatherEntity,
     WeatherEntityFeature,
@@ -31,55 +14,41 @@ from homeassistant.const import (
     UnitOfSpeed,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import (
+    async_track_point_in_utc_time,
+    async_track_time_interval,
+)
 from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity
 
-from . import api
-from .const import CONF_GEOLOCATION_ID
+from .const import (
+    CONF_GEOLOCATION_ID,
+    CONF_INTERPOLATE_MINUTES,
+    DEFAULT_INTERPOLATE_MINUTES,
+)
 from .coordinator import Coordinator, get_coordinator
-from .helpers import get_geolocation_description
+from .forecast import ForecastSrf, ForecastSrfExtra, SrfForecastData
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(minutes=15)
-
-# you can download the icon set here: https://developer.srgssr.ch/api-catalog/srf-weather/srf-weather-description
-ICON_CONDITION_MAP: dict[str, list[int]] = {
-    ATTR_CONDITION_CLEAR_NIGHT: [-1],
-    ATTR_CONDITION_CLOUDY: [18, 19],
-    ATTR_CONDITION_EXCEPTIONAL: [],
-    ATTR_CONDITION_FOG: [2, 17],
-    ATTR_CONDITION_HAIL: [],
-    ATTR_CONDITION_LIGHTNING_RAINY: [
-        5,
-        12,
-        26,
-        # these have snow (or hail?) in them as well
-        9,
-        16,
-        30,
-    ],
-    ATTR_CONDITION_LIGHTNING: [],
-    ATTR_CONDITION_PARTLYCLOUDY: [3, 10],
-    ATTR_CONDITION_POURING: [23],
-    ATTR_CONDITION_RAINY: [4, 11, 20, 25],
-    ATTR_CONDITION_SNOWY_RAINY: [8, 15, 22, 29],
-    ATTR_CONDITION_SNOWY: [
-        6,
-        13,
-        21,
-        24,
-        27,
-        # the following ones are more like "lightning snowy", but that doesn't exist
-        5,
-        12,
-        26,
-    ],
-    ATTR_CONDITION_SUNNY: [1],
-    ATTR_CONDITION_WINDY_VARIANT: [],
-    ATTR_CONDITION_WINDY: [],
-}
+_EXTRA_ATTRIBUTE_KEYS = tuple(
+    sorted(ForecastSrfExtra.__required_keys__ | ForecastSrfExtra.__optional_keys__)
+)
+# every field of the current forecast that ends up in the state
+_STATE_KEYS = (
+    "condition",
+    "humidity",
+    "native_apparent_temperature",
+    "native_dew_point",
+    "native_pressure",
+    "native_temperature",
+    "native_wind_gust_speed",
+    "native_wind_speed",
+    "uv_index",
+    "wind_bearing",
+    *_EXTRA_ATTRIBUTE_KEYS,
+)
 
 
 async def async_setup_entry(
@@ -89,17 +58,27 @@ async def async_setup_entry(
 ) -> None:
     geolocation_id = config_entry.data[CONF_GEOLOCATION_ID]
     coordinator = get_coordinator(hass, config_entry.data)
+    interpolate_minutes = config_entry.options.get(
+        CONF_INTERPOLATE_MINUTES, DEFAULT_INTERPOLATE_MINUTES
+    )
 
     async_add_entities(
         [
-            SrfWeather(coordinator, geolocation_id=geolocation_id),
+            SrfWeather(
+                coordinator,
+                geolocation_id=geolocation_id,
+                interpolate_interval=timedelta(minutes=interpolate_minutes)
+                if interpolate_minutes
+                else None,
+            ),
         ],
     )
 
 
 class SrfWeather(WeatherEntity, RestoreEntity):
     _attr_has_entity_name = True
-    _attr_should_poll = True
+    # the forecast coordinator pushes new data and the current slot is tracked with a timer
+    _attr_should_poll = False
 
     _attr_supported_features = (
         WeatherEntityFeature.FORECAST_DAILY | WeatherEntityFeature.FORECAST_HOURLY
@@ -111,15 +90,31 @@ class SrfWeather(WeatherEntity, RestoreEntity):
     _attr_native_precipitation_unit = UnitOfPrecipitationDepth.MILLIMETERS
     _attr_native_wind_speed_unit = UnitOfSpeed.KILOMETERS_PER_HOUR
 
-    def __init__(self, coordinator: Coordinator, *, geolocation_id: str) -> None:
+    def __init__(
+        self,
+        coordinator: Coordinator,
+        *,
+        geolocation_id: str,
+        interpolate_interval: timedelta | None = None,
+    ) -> None:
         self.coordinator = coordinator
         self.geolocation_id = geolocation_id
+        # if set, the current values are interpolated between forecasts and updated at this interval
+        self.interpolate_interval = interpolate_interval
 
         self._attr_unique_id = geolocation_id
         self._attr_name = None  # determined by data
 
+        self._forecast = coordinator.get_forecast_coordinator(geolocation_id)
         self._srf_data: SrfForecastData | None = None
-        self._next_update_at: datetime | None = None
+        self._unsub_slot_timer: CALLBACK_TYPE | None = None
+        # materialized forecast lists, keyed by (data version, slot index)
+        self._data_version = 0
+        self._slot: tuple[int, int] | None = None
+        self._slot_forecast: ForecastSrf | None = None
+        self._forecast_lists: dict[str, tuple[tuple[int, int], list[Forecast]]] = {}
+        # everything the state is derived from, the state is only written when it changes
+        self._fingerprint: tuple[Any, ...] | None = None
 
         self._set_forecast_now({})
 
@@ -127,9 +122,17 @@ class SrfWeather(WeatherEntity, RestoreEntity):
     def extra_restore_state_data(self) -> ExtraStoredData | None:
         if not self._srf_data:
             return None
-        return self._srf_data
+        # only the live window is written, elapsed forecasts would just bloat the restore state
+        return self._srf_data.prune(
+            datetime.now(tz=timezone.utc), keep=self._forecast.keep_elapsed
+        )
 
     def _set_forecast_now(self, forecast_now: Forecast | dict[str, Any]) -> None:
+        fingerprint = (self._attr_name, *(forecast_now.get(key) for key in _STATE_KEYS))
+        if fingerprint == self._fingerprint:
+            return
+        self._fingerprint = fingerprint
+
         self._attr_condition = forecast_now.get("condition")
         self._attr_humidity = forecast_now.get("humidity")
         self._attr_native_apparent_temperature = forecast_now.get(
@@ -144,234 +147,167 @@ class SrfWeather(WeatherEntity, RestoreEntity):
         self._attr_wind_bearing = forecast_now.get("wind_bearing")
 
         self._attr_extra_state_attributes = {}
-        for key in (
-            ForecastSrfExtra.__required_keys__ | ForecastSrfExtra.__optional_keys__
-        ):
+        for key in _EXTRA_ATTRIBUTE_KEYS:
             value = forecast_now.get(key)
             if value is not None:
                 self._attr_extra_state_attributes[key] = value
 
-    def _set_srf_data(self, data: "SrfForecastData") -> None:
+    @callback
+    def _handle_srf_data(self, data: SrfForecastData) -> None:
+        fingerprint = self._fingerprint
+        forecast_types: list[Literal["hourly", "daily"]]
+        if data is self._srf_data:
+            # the payload didn't change, so the forecasts only change if a slot boundary passed
+            forecast_types = self._update_forecast_now()
+        else:
+            self._set_srf_data(data)
+            forecast_types = ["hourly", "daily"]
+        self._write_changes(fingerprint, forecast_types)
+
+    def _set_srf_data(self, data: SrfForecastData) -> None:
         self._srf_data = data
-        self._next_update_at = self.coordinator.request_next_api_call()
-        _LOGGER.debug("data updated, next update at %s", self._next_update_at)
+        self._attr_name = data.name
+        self._data_version += 1
+        self._forecast_lists.clear()
+        self._update_forecast_now()
+
+    def _update_forecast_now(self) -> list[Literal["hourly", "daily"]]:
+        """Update the current conditions and schedule the next update for when the current slot ends.
+
+        Returns the forecast types whose list changed because a slot boundary passed.
+        """
+        if self._unsub_slot_timer:
+            self._unsub_slot_timer()
+            self._unsub_slot_timer = None
+        if not self._srf_data:
+            return []
 
         now = datetime.now(tz=timezone.utc)
-        self._set_forecast_now(self._srf_data.get_forecast(now) or {})
-        self._attr_name = data.name
+        slot, previous_slot = self._srf_data.get_slot(now), self._slot
+        self._slot = slot
+        self._slot_forecast = self._srf_data.get_forecast(now)
+        self._set_forecast_now(self._get_forecast_now(now))
+        if slot_end := self._srf_data.get_slot_end(now):
+            self._unsub_slot_timer = async_track_point_in_utc_time(
+                self.hass, self._handle_slot_end, slot_end
+            )
+
+        if previous_slot is None:
+            return []
+        changed: list[Literal["hourly", "daily"]] = []
+        if slot[0] != previous_slot[0]:
+            changed.append("hourly")
+        if slot[1] != previous_slot[1]:
+            changed.append("daily")
+        return changed
+
+    def _get_forecast_now(self, now: datetime) -> Forecast | dict[str, Any]:
+        if self._slot_forecast is None:
+            return {}
+        if not self.interpolate_interval or not self._srf_data or not self._slot:
+            return self._slot_forecast
+        return self._slot_forecast | self._srf_data.hourly.interpolate(
+            self._slot[0], now
+        )
+
+    @callback
+    def _handle_interpolate(self, now: datetime) -> None:
+        # the slot and its forecast are known, so this only has to interpolate a few values
+        fingerprint = self._fingerprint
+        self._set_forecast_now(self._get_forecast_now(now))
+        self._write_changes(fingerprint, [])
+
+    @callback
+    def _handle_slot_end(self, now: datetime) -> None:
+        self._unsub_slot_timer = None
+        fingerprint = self._fingerprint
+        self._write_changes(fingerprint, self._update_forecast_now())
+
+    @callback
+    def _write_changes(
+        self,
+        fingerprint: tuple[Any, ...] | None,
+        forecast_types: list[Literal["hourly", "daily"]],
+    ) -> None:
+        """Write the state if it changed since `fingerprint` was taken and push the changed forecasts."""
+        if self._fingerprint != fingerprint:
+            self.async_write_ha_state()
+        self._push_forecasts(forecast_types)
+
+    @callback
+    def _push_forecasts(self, forecast_types: list[Literal["hourly", "daily"]]) -> None:
+        if forecast_types:
+            self.hass.async_create_task(self.async_update_listeners(forecast_types))
 
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
-        self.coordinator.consumers += 1
 
-        if last_extra_data := await self.async_get_last_extra_data():
-            self._set_srf_data(SrfForecastData.from_dict(last_extra_data.as_dict()))
+        if self._forecast.data is None:
+            await self._forecast.async_load()
+        if self._forecast.data is None and (
+            last_extra_data := await self.async_get_last_extra_data()
+        ):
+            self._forecast.async_restore(
+                SrfForecastData.from_dict(last_extra_data.as_dict())
+            )
             _LOGGER.debug("restored srf data")
-        self.async_schedule_update_ha_state(True)
+        if self._forecast.data is not None:
+            self._set_srf_data(self._forecast.data)
+            # entities can't have forecast subscribers before they're added, nothing to push yet
+
+        # the forecast coordinator fetches new data when it's due and passes it to the listener
+        self.async_on_remove(self._forecast.async_add_listener(self._handle_srf_data))
+        if self.interpolate_interval:
+            self.async_on_remove(
+                async_track_time_interval(
+                    self.hass, self._handle_interpolate, self.interpolate_interval
+                )
+            )
 
     async def async_will_remove_from_hass(self) -> None:
         await super().async_will_remove_from_hass()
-        self.coordinator.consumers -= 1
+        if self._unsub_slot_timer:
+            self._unsub_slot_timer()
+            self._unsub_slot_timer = None
 
     async def async_update(self) -> None:
+        # only called when an update is explicitly requested
         now = datetime.now(tz=timezone.utc)
-        should_update = self._srf_data is None
-        should_update |= self._next_update_at is None or now >= self._next_update_at
-        if should_update:
-            _LOGGER.info("updating forecast from api")
-            forecast_week = (
-                await self.coordinator.client.get_forecast_week_by_geo_location(
-                    self.geolocation_id
-                )
-            )
-            self._set_srf_data(SrfForecastData.create_from_api(forecast_week))
+        if self._forecast.should_update(now):
+            # the new data is passed to all listeners, including this entity
+            await self._forecast.async_refresh()
             return
 
-        assert self._srf_data  # is always set here
-        self._set_forecast_now(self._srf_data.get_forecast(now) or {})
+        self._push_forecasts(self._update_forecast_now())
 
     @property
     def available(self) -> bool:
         return self._srf_data is not None
 
-    async def async_forecast_hourly(self) -> list[Forecast] | None:
+    def _get_forecast_list(
+        self, forecast_type: Literal["hourly", "daily"]
+    ) -> list[Forecast] | None:
+        """Materialized forecast list, only rebuilt when new data arrives or a slot boundary passes."""
         if not self._srf_data:
             return None
-        now = datetime.now(tz=timezone.utc)
-        return list(self._srf_data.iter_hourly(now))
-
-    async def async_forecast_daily(self) -> list[Forecast] | None:
-        if not self._srf_data:
-            return None
-        now = datetime.now(tz=timezone.utc)
-        return list(self._srf_data.iter_daily(now))
-
-
-class ForecastSrfExtra(TypedDict, total=False):
-    symbol_code: int | None
-    symbol24_code: int | None
-
-    # for daily forecast
-    sunrise: str | None
-    sunset: str | None
-    sunshine_hours: int | None
-
-    # hourly forecast
-    temphigh: float | None
-    fresh_snow_cm: int | None
-    sunshine_minutes: int | None
-    irradiance: int | None
-    color: api.Color | None
-
-
-class ForecastSrf(ForecastSrfExtra, Forecast):
-    ...
-
-
-@dataclasses.dataclass(slots=True, kw_only=True)
-class SrfForecastData(ExtraStoredData):
-    name: str
-    hourly: list[ForecastSrf]
-    daily: list[ForecastSrf]
-
-    def as_dict(self) -> dict[str, Any]:
-        return {
-            "hourly": self.hourly,
-            "daily": self.daily,
-        }
-
-    @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "SrfForecastData":
-        return SrfForecastData(
-            name=data.get("name", ""), hourly=data["hourly"], daily=data["daily"]
+        hourly_index, daily_index = self._srf_data.get_slot(
+            datetime.now(tz=timezone.utc)
         )
+        if forecast_type == "hourly":
+            series, index = self._srf_data.hourly, hourly_index
+        else:
+            series, index = self._srf_data.daily, daily_index
+
+        key = (self._data_version, index)
+        cached = self._forecast_lists.get(forecast_type)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        forecasts: list[Forecast] = list(series.iter_from(index))
+        self._forecast_lists[forecast_type] = (key, forecasts)
+        return forecasts
 
-    @classmethod
-    def create_from_api(cls, forecast_week: api.ForecastPointWeek) -> "SrfForecastData":
-        uvi_by_date = _build_uvi_by_date(forecast_week["days"])
-        hourly = [
-            forecast_from_hourly(
-                forecast,
-                uv_index=_get_uvi_for_hourly(uvi_by_date, forecast["date_time"]),
-            )
-            for forecast in forecast_week["hours"]
-        ]
-        hourly.extend(
-            forecast_from_hourly(
-                forecast,
-                uv_index=_get_uvi_for_hourly(uvi_by_date, forecast["date_time"]),
-            )
-            for forecast in forecast_week["three_hours"]
-        )
-        daily = [forecast_from_daily(forecast) for forecast in forecast_week["days"]]
-        name = get_geolocation_description(forecast_week["geolocation"])
-        return SrfForecastData(name=name, hourly=hourly, daily=daily)
-
-    def get_forecast(self, ts: datetime) -> ForecastSrf | None:
-        return next(self.iter_hourly(ts), None)
-
-    def iter_hourly(self, ts: datetime) -> Iterator[ForecastSrf]:
-        return self._iter_forecasts(self.hourly, ts)
-
-    def iter_daily(self, ts: datetime) -> Iterator[ForecastSrf]:
-        return self._iter_forecasts(self.daily, ts)
-
-    def _iter_forecasts(
-        self, forecasts: Iterable[ForecastSrf], ts: datetime
-    ) -> Iterator[ForecastSrf]:
-        it = iter(forecasts)
-        for forecast in it:
-            ends_at = datetime.fromisoformat(forecast["datetime"])
-            if ts < ends_at:
-                yield forecast
-                # once we've found the first valid forecast, the rest of them HAVE to be valid
-                break
-        yield from it
-
-
-def _build_uvi_by_date(days: list[api.DayForecastInterval]) -> dict[date, float | None]:
-    mapping: dict[date, float | None] = {}
-    for day in days:
-        dt = datetime.fromisoformat(day["date_time"])
-        mapping[dt.date()] = day.get("UVI")
-    return mapping
-
-
-def _get_uvi_for_hourly(
-    uvi_by_date: dict[date, float | None], date_time: str
-) -> float | None:
-    dt = datetime.fromisoformat(date_time)
-    return uvi_by_date.get(dt.date())
-
-
-def forecast_from_hourly(
-    forecast: api.OneHourForecastInterval, *, uv_index: float | None
-) -> ForecastSrf:
-    return ForecastSrf(
-        condition=condition_from_forecast(forecast),
-        datetime=forecast["date_time"],
-        humidity=forecast.get("RELHUM_PERCENT"),
-        precipitation_probability=forecast["PROBPCP_PERCENT"],
-        cloud_coverage=None,
-        native_precipitation=forecast["RRR_MM"],
-        native_pressure=forecast.get("PRESSURE_HPA"),
-        native_temperature=forecast["TTT_C"],
-        native_templow=forecast.get("TTL_C"),
-        native_apparent_temperature=forecast.get("TTTFEEL_C"),
-        wind_bearing=forecast["DD_DEG"],
-        native_wind_gust_speed=forecast["FX_KMH"],
-        native_wind_speed=forecast["FF_KMH"],
-        native_dew_point=forecast.get("DEWPOINT_C"),
-        uv_index=uv_index,
-        is_daytime=None,
-        # srf extra
-        symbol_code=forecast.get("symbol_code"),
-        symbol24_code=forecast.get("symbol24_code"),
-        temphigh=forecast.get("TTH_C"),
-        fresh_snow_cm=forecast.get("FRESHSNOW_CM"),
-        sunshine_minutes=forecast.get("SUN_MIN"),
-        irradiance=forecast.get("IRRADIANCE_WM2"),
-        color=forecast.get("cur_color"),
-    )
-
-
-def forecast_from_daily(forecast: api.DayForecastInterval) -> ForecastSrf:
-    return ForecastSrf(
-        condition=condition_from_forecast(forecast),
-        datetime=forecast["date_time"],
-        humidity=None,
-        precipitation_probability=forecast["PROBPCP_PERCENT"],
-        cloud_coverage=None,
-        native_precipitation=forecast["RRR_MM"],
-        native_pressure=None,
-        native_temperature=forecast["TX_C"],  # this is technically the max temperature
-        native_templow=forecast["TN_C"],
-        native_apparent_temperature=None,
-        wind_bearing=forecast["DD_DEG"],
-        native_wind_gust_speed=forecast["FX_KMH"],
-        native_wind_speed=forecast["FF_KMH"],
-        native_dew_point=None,
-        uv_index=forecast.get("UVI"),
-        is_daytime=None,
-        # srf extra
-        symbol_code=forecast.get("symbol_code"),
-        symbol24_code=forecast.get("symbol24_code"),
-        sunrise=forecast.get("SUNRISE"),
-        sunset=forecast.get("SUNSET"),
-        sunshine_hours=forecast.get("SUN_H"),
-    )
-
-
-_INV_ICON2COND = {
-    icon: condition for condition, icons in ICON_CONDITION_MAP.items() for icon in icons
-}
-
+    async def async_forecast_hourly(self) -> list[Forecast] | None:
+        return self._get_forecast_list("hourly")
 
-def condition_from_forecast(forecast: api.ForecastABC) -> str | None:
-    icon = forecast["symbol_code"]
-    try:
-        return _INV_ICON2COND[icon]
-    except KeyError:
-        pass
-    # invert day / night (night icons are negative) and try to look up that
-    return _INV_ICON2COND.get(-icon)
+    async def async_forecast_daily(self) -> list[Forecast] | None:
+        return self._get_forecast_list("daily")
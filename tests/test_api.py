@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import aiohttp
+import pytest
+
+from custom_components.srf_weather.api import AuthToken, OauthClient
+
+
+def _get_authorization_header(token: AuthToken | None) -> str:
+    async def run() -> str:
+        async with aiohttp.ClientSession() as session:
+            oauth = OauthClient(
+                session, consumer_auth=aiohttp.BasicAuth("key", "secret")
+            )
+            oauth._token = token
+            with mock.patch.object(
+                oauth,
+                "_get_access_token",
+                side_effect=aiohttp.ClientConnectionError("token endpoint down"),
+            ):
+                return await oauth.get_authorization_header()
+
+    return asyncio.run(run())
+
+
+def test_failed_refresh_keeps_the_valid_token():
+    now = datetime.now(tz=timezone.utc)
+    token = AuthToken(
+        authorization_header="Bearer current",
+        expires_at=now + timedelta(minutes=4),
+        refresh_at=now - timedelta(minutes=1),
+    )
+
+    assert _get_authorization_header(token) == "Bearer current"
+
+
+def test_failed_refresh_raises_once_the_token_expired():
+    now = datetime.now(tz=timezone.utc)
+    token = AuthToken(
+        authorization_header="Bearer expired",
+        expires_at=now - timedelta(seconds=1),
+        refresh_at=now - timedelta(minutes=5),
+    )
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        _get_authorization_header(token)
@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+
+from custom_components.srf_weather.forecast import SrfForecastData
+
+_GEOLOCATION = {"default_name": "Zürich", "station_id": "SMA"}
+
+
+def _interval(end: datetime, value: float) -> dict[str, Any]:
+    return {
+        "date_time": end.isoformat(),
+        "symbol_code": 1,
+        "RRR_MM": value,
+        "TTT_C": value * 10,
+    }
+
+
+def _forecast_week(
+    hours: list[tuple[str, float]], three_hours: list[tuple[str, float]]
+) -> dict[str, Any]:
+    return {
+        "geolocation": _GEOLOCATION,
+        "hours": [
+            _interval(datetime.fromisoformat(end), value) for end, value in hours
+        ],
+        "three_hours": [
+            _interval(datetime.fromisoformat(end), value) for end, value in three_hours
+        ],
+        "days": [],
+    }
+
+
+def _column(data: SrfForecastData, key: str) -> list[Any]:
+    return [forecast[key] for forecast in data.hourly]
+
+
+def _times(data: SrfForecastData) -> list[str]:
+    return [forecast["datetime"][11:16] for forecast in data.hourly]
+
+
+# hourly intervals from 10:00 to 16:00, three hour intervals from 09:00 to 21:00
+_OVERLAPPING = _forecast_week(
+    [(f"2024-06-01T{hour}:00:00+02:00", 1.0) for hour in range(11, 17)],
+    [
+        ("2024-06-01T12:00:00+02:00", 3.0),
+        ("2024-06-01T15:00:00+02:00", 6.0),
+        ("2024-06-01T18:00:00+02:00", 9.0),
+        ("2024-06-01T21:00:00+02:00", 12.0),
+    ],
+)
+
+
+def test_merge_prefers_the_shorter_interval():
+    data = SrfForecastData.create_from_api(_OVERLAPPING)
+
+    assert _times(data) == [
+        "11:00",
+        "12:00",
+        "13:00",
+        "14:00",
+        "15:00",
+        "16:00",
+        "18:00",
+        "21:00",
+    ]
+    assert _column(data, "native_temperature") == [
+        10.0,
+        10.0,
+        10.0,
+        10.0,
+        10.0,
+        10.0,
+        90.0,
+        120.0,
+    ]
+
+
+def test_merge_only_accumulates_the_uncovered_part():
+    data = SrfForecastData.create_from_api(_OVERLAPPING)
+
+    # 16:00 - 18:00 is the uncovered part of the 15:00 - 18:00 interval
+    assert _column(data, "native_precipitation") == [
+        1.0,
+        1.0,
+        1.0,
+        1.0,
+        1.0,
+        1.0,
+        6.0,
+        12.0,
+    ]
+
+
+def test_resample_keeps_the_partial_tail():
+    data = SrfForecastData.create_from_api(
+        _OVERLAPPING, resample_step=timedelta(hours=2)
+    )
+
+    assert _times(data) == ["12:00", "14:00", "16:00", "18:00", "20:00", "21:00"]
+    assert _column(data, "native_precipitation") == [2.0, 2.0, 2.0, 6.0, 8.0, 4.0]
+    # 20:00 lies between the ends at 18:00 and 21:00
+    assert _column(data, "native_temperature") == [
+        10.0,
+        10.0,
+        10.0,
+        90.0,
+        110.0,
+        120.0,
+    ]
+
+
+@pytest.mark.parametrize("hours", [1, 2, 3, 5, 6])
+def test_resample_preserves_the_total(hours: int):
+    merged = SrfForecastData.create_from_api(_OVERLAPPING)
+    resampled = SrfForecastData.create_from_api(
+        _OVERLAPPING, resample_step=timedelta(hours=hours)
+    )
+
+    assert resampled.hourly[len(resampled.hourly) - 1]["datetime"] == (
+        "2024-06-01T21:00:00+02:00"
+    )
+    assert sum(_column(resampled, "native_precipitation")) == pytest.approx(
+        sum(_column(merged, "native_precipitation")), abs=0.01 * len(resampled.hourly)
+    )
+
+
+def test_resample_aligns_to_local_midnight():
+    data = SrfForecastData.create_from_api(
+        _forecast_week(
+            [
+                (
+                    (datetime(2024, 6, 1, 20) + timedelta(hours=hour)).isoformat()
+                    + "+02:00",
+                    1.0,
+                )
+                for hour in range(1, 8)
+            ],
+            [],
+        ),
+        resample_step=timedelta(hours=5),
+    )
+
+    # a step that doesn't divide the day cuts the last slot of the day short
+    assert [forecast["datetime"] for forecast in data.hourly] == [
+        "2024-06-02T00:00:00+02:00",
+        "2024-06-02T03:00:00+02:00",
+    ]
+    assert _column(data, "native_precipitation") == [4.0, 3.0]
+
+
+def test_resample_step_survives_the_round_trip():
+    data = SrfForecastData.create_from_api(
+        _OVERLAPPING, resample_step=timedelta(hours=3)
+    )
+
+    restored = SrfForecastData.from_dict(data.as_dict())
+
+    assert restored.resample_step == timedelta(hours=3)
+    assert list(restored.hourly) == list(data.hourly)
+
+
+def test_integer_fields_stay_integers():
+    forecast_week = _forecast_week([("2024-06-01T11:00:00+02:00", 1.0)], [])
+    forecast_week["hours"][0]["TTL_C"] = 8.0
+    forecast_week["days"] = [
+        {
+            "date_time": "2024-06-01T00:00:00+02:00",
+            "symbol_code": 1,
+            "TX_C": 14,
+            "TN_C": 3,
+            "UVI": 5,
+        }
+    ]
+    data = SrfForecastData.create_from_api(forecast_week)
+
+    for restored in (data, SrfForecastData.from_dict(data.as_dict())):
+        hourly, daily = restored.hourly[0], restored.daily[0]
+        assert type(hourly["native_temperature"]) is int
+        assert type(hourly["uv_index"]) is int
+        # the low temperature of the hourly forecasts is a float in the api
+        assert type(hourly["native_templow"]) is float
+        assert type(daily["native_temperature"]) is int
+        assert type(daily["native_templow"]) is int
+        assert type(daily["uv_index"]) is int
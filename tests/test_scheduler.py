@@ -0,0 +1,119 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from custom_components.srf_weather.api import Ratelimit
+from custom_components.srf_weather.metrics import Metrics
+from custom_components.srf_weather.scheduler import QuotaScheduler, RunCadence
+
+_START = datetime(2024, 6, 1, tzinfo=timezone.utc)
+_PERIOD = timedelta(hours=3)
+
+
+def test_cadence_merges_the_windows_of_the_same_run():
+    cadence = RunCadence()
+    for run in range(4):
+        published = _START + run * _PERIOD
+        # staggered fetches 20 minutes apart, each of them sees the run
+        for geolocation in range(3):
+            fetched_at = published + geolocation * timedelta(minutes=20)
+            cadence.record_run(
+                fetched_at + timedelta(minutes=10),
+                not_before=fetched_at - timedelta(minutes=50),
+            )
+
+    assert cadence.period == _PERIOD
+    # only the 10 minutes before and after the run are in the window of every geolocation
+    assert cadence.get_previous_run(_START + 4 * _PERIOD - timedelta(minutes=1)) == (
+        _START + 3 * _PERIOD
+    )
+
+
+def test_cadence_places_runs_where_they_are_expected():
+    cadence = RunCadence()
+    for run in range(4):
+        published = _START + run * _PERIOD
+        cadence.record_run(
+            published + timedelta(minutes=1),
+            not_before=published - timedelta(minutes=1),
+        )
+
+    # seen late, but the window doesn't rule out the expected time
+    cadence.record_run(
+        _START + 4 * _PERIOD + timedelta(minutes=30),
+        not_before=_START + 3 * _PERIOD + timedelta(minutes=5),
+    )
+    assert cadence.get_previous_run() == _START + 4 * _PERIOD
+    assert cadence.period == _PERIOD
+
+    # the fetch at the expected time didn't see the next one yet
+    late = _START + 5 * _PERIOD + timedelta(minutes=10)
+    cadence.record_run(late + timedelta(minutes=15), not_before=late)
+    assert cadence.get_previous_run() == late
+
+
+def test_cadence_needs_enough_runs():
+    cadence = RunCadence()
+    for run in range(3):
+        published = _START + run * _PERIOD
+        cadence.record_run(published, not_before=published - timedelta(minutes=1))
+
+    assert cadence.period is None
+
+
+class _Client:
+    """What the scheduler needs from the api client, with plenty of quota."""
+
+    def __init__(self, now: datetime) -> None:
+        self.metrics = Metrics()
+        self.ratelimit = Ratelimit(
+            allowed=10_000, available=10_000, reset_time=now + timedelta(days=1)
+        )
+        self.circuit_open_until = None
+
+
+@pytest.mark.parametrize(
+    ("period", "offset"),
+    [
+        (timedelta(hours=3), timedelta()),
+        (timedelta(hours=3), timedelta(minutes=47)),
+        (timedelta(hours=2, minutes=50), timedelta(minutes=13)),
+        (timedelta(hours=6), timedelta(minutes=5)),
+    ],
+)
+def test_scheduler_follows_periodic_runs(period: timedelta, offset: timedelta):
+    # the scheduler never plans before the actual time, so the simulation runs in the future
+    now = datetime.now(tz=timezone.utc)
+    start = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    first_run = start + offset
+    scheduler = QuotaScheduler(_Client(now))  # type: ignore[arg-type]
+    geolocations = [f"geolocation-{i}" for i in range(3)]
+    for geolocation_id in geolocations:
+        scheduler.add_consumer(geolocation_id)
+
+    seen: dict[str, int] = {}
+    # lag of every fetch that picked up a run and the number of fetches, once the cadence had a day to settle
+    lags: list[timedelta] = []
+    fetches = 0
+    ts = start
+    while ts < start + timedelta(days=6):
+        geolocation_id, planned = next(iter(scheduler.plan.items()))
+        ts = max(ts, planned)
+        published = math.floor((ts - first_run) / period)
+        changed = None
+        if geolocation_id in seen:
+            changed = published != seen[geolocation_id]
+        seen[geolocation_id] = published
+        scheduler.record_fetch(geolocation_id, ts, changed=changed)
+        if ts < start + timedelta(days=1):
+            continue
+        fetches += 1
+        if changed:
+            lags.append(ts - (first_run + published * period))
+
+    assert scheduler.cadence.period == pytest.approx(period, abs=timedelta(minutes=1))
+    # late runs are retried every 15 minutes, the lag must not build up from run to run
+    assert max(lags) <= timedelta(minutes=15)
+    # one fetch after every run, the probe and the odd retry
+    assert fetches < 2 * len(geolocations) * (timedelta(days=5) / period)